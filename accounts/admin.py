@@ -22,6 +22,10 @@ class CustomUserAdmin(UserAdmin):
         queryset, use_distinct = super().get_search_results(request, queryset, search_term)
         return queryset, use_distinct
     
+    # related_info liste les classes et les enfants : chargés pour toute la page en deux requêtes
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('taught_classes', 'children')
+    
     def has_module_permission(self, request):
         return request.user.is_superuser or request.user.is_director
     
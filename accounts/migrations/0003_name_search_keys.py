@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:04
+
+from django.db import migrations, models
+
+from accounts.utils import name_keys
+
+
+def populate_name_keys(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    rows = list(CustomUser.objects.only('first_name', 'last_name'))
+    for row in rows:
+        row.first_name_key, row.last_name_key = name_keys(row.first_name, row.last_name)
+    CustomUser.objects.bulk_update(rows, ['first_name_key', 'last_name_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_customuser_is_director_alter_customuser_is_parent_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='first_name_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=301),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='last_name_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=301),
+        ),
+        migrations.RunPython(populate_name_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_name_search_keys'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['last_name', 'first_name', 'id'], name='user_name_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['date_joined', 'id'], name='user_joined_order_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+from accounts.utils import username_key
+
+
+def populate_username_keys(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    rows = list(CustomUser.objects.only('username'))
+    for row in rows:
+        row.username_key = username_key(row.username)
+    CustomUser.objects.bulk_update(rows, ['username_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_list_order_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='username_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=150),
+        ),
+        migrations.RunPython(populate_username_keys, migrations.RunPython.noop),
+    ]
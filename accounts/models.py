@@ -4,11 +4,24 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from .utils import NAME_KEY_MAX_LENGTH, USERNAME_KEY_MAX_LENGTH, name_keys, username_key
+
 class CustomUser(AbstractUser):
     # On ajoute des booléens pour savoir qui est qui facilement
     is_parent = models.BooleanField(default=False, verbose_name="Est parent")
     is_teacher = models.BooleanField(default=False, verbose_name="Est professeur")
     is_director = models.BooleanField(default=False, verbose_name="Est directeur")
+    # Clés de recherche sans accents, calculées à l'enregistrement (voir accounts/utils.py)
+    first_name_key = models.CharField(max_length=NAME_KEY_MAX_LENGTH, blank=True, db_index=True, editable=False)
+    last_name_key = models.CharField(max_length=NAME_KEY_MAX_LENGTH, blank=True, db_index=True, editable=False)
+    username_key = models.CharField(max_length=USERNAME_KEY_MAX_LENGTH, blank=True, db_index=True, editable=False)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Ordres des listes paginées du panel administrateur (school_core/pagination.py)
+            models.Index(fields=['last_name', 'first_name', 'id'], name='user_name_order_idx'),
+            models.Index(fields=['date_joined', 'id'], name='user_joined_order_idx'),
+        ]
 
     def __str__(self):
         return self.username
@@ -18,6 +31,13 @@ class CustomUser(AbstractUser):
         if self.is_director:
             self.is_staff = True
             self.is_teacher = True  # Un directeur est aussi professeur
+        self.first_name_key, self.last_name_key = name_keys(self.first_name, self.last_name)
+        self.username_key = username_key(self.username)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'first_name', 'last_name'} & set(update_fields):
+            update_fields = kwargs['update_fields'] = {*update_fields, 'first_name_key', 'last_name_key'}
+        if update_fields is not None and 'username' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'username_key'}
         super().save(*args, **kwargs)
     
     def get_role_display(self):
@@ -0,0 +1,71 @@
+# accounts/utils.py
+# Clés de recherche des noms : minuscules, sans accents ("Éloïse Lefèvre" -> "eloise lefevre")
+#
+# Les clés sont stockées dans des colonnes indexées (CustomUser, Student) et
+# interrogées par préfixe avec un intervalle cle >= "elo" AND cle < "elp",
+# que l'index B-tree sait parcourir, contrairement à LIKE '%elo%'.
+
+import re
+import unicodedata
+
+from django.db.models import Q
+
+NAME_KEY_MAX_LENGTH = 301
+USERNAME_KEY_MAX_LENGTH = 150
+_NOT_WORD = re.compile(r'[^\w@.]+', re.UNICODE)
+
+
+def fold(text):
+    """Minuscules, accents retirés, ponctuation remplacée par des espaces"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    without_accents = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(_NOT_WORD.sub(' ', without_accents.casefold()).split())
+
+
+def name_keys(first_name, last_name):
+    """Clés "prénom nom" et "nom prénom" : la recherche trouve l'un ou l'autre en premier"""
+    return fold(f'{first_name} {last_name}')[:NAME_KEY_MAX_LENGTH], fold(f'{last_name} {first_name}')[:NAME_KEY_MAX_LENGTH]
+
+
+def username_key(username):
+    """Clé du nom d'utilisateur ("Jean.Dupont" -> "jean.dupont")"""
+    return fold(username)[:USERNAME_KEY_MAX_LENGTH]
+
+
+def prefix_bounds(prefix):
+    """Bornes d'un préfixe : les chaînes commençant par "elo" sont dans ["elo", "elp")"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def prefix_search_q(term, fields):
+    """
+    Condition "un des champs commence par le terme replié".
+    Retourne None si le terme est vide après normalisation.
+    """
+    prefix = fold(term)
+    if not prefix:
+        return None
+    lower, upper = prefix_bounds(prefix)
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__gte': lower, f'{field}__lt': upper})
+    return condition
+
+
+def name_search_q(term):
+    """Recherche d'une personne (CustomUser ou Student) par prénom ou nom"""
+    return prefix_search_q(term, ['first_name_key', 'last_name_key'])
+
+
+def user_search_q(term):
+    """Recherche d'un compte : prénom, nom, début du nom d'utilisateur ou e-mail exact"""
+    condition = name_search_q(term)
+    if condition is None:
+        return None
+    term = term.strip()
+    # Même repliement que la clé : "Jean" trouve "jean.dupont"
+    lower, upper = prefix_bounds(username_key(term))
+    condition |= Q(username_key__gte=lower, username_key__lt=upper)
+    if '@' in term:
+        condition |= Q(email__iexact=term)
+    return condition
@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Importé après l'initialisation de Django (accès aux modèles)
+from school_core.realtime import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """HTTP vers Django, WebSocket (/ws/conversations/<id>/) vers la diffusion temps réel"""
+    if scope['type'] == 'websocket':
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,59 @@
+# config/cache.py
+# Configuration du cache (CACHES) à partir des variables d'environnement
+#
+# SCHOOL_CACHE_BACKEND      locmem (défaut en dev et test) : LRU en mémoire, propre à chaque processus
+#                           file : un fichier par entrée, partagé par les processus de la machine
+#                           sqlite (défaut en production) : base SQLite en mode WAL, partagée par
+#                           les workers de la machine
+# SCHOOL_CACHE_LOCATION     répertoire (file) ou fichier (sqlite) ; défaut dans var/
+# SCHOOL_CACHE_TIMEOUT      durée par défaut des entrées, en secondes (défaut 300)
+# SCHOOL_CACHE_MAX_ENTRIES  nombre d'entrées au-delà duquel les plus anciennes sont retirées (défaut 10000)
+#
+# Les périmètres d'accès, versions des listes de classes et des fragments sont
+# invalidés par les signaux du processus qui écrit : avec plusieurs workers, ils
+# ne sont justes qu'avec un cache partagé. Le profil prod refuse donc locmem.
+
+from django.core.exceptions import ImproperlyConfigured
+
+BACKENDS = {
+    'locmem': 'school_core.cache_backends.LocMemCache',
+    'file': 'school_core.cache_backends.FileBasedCache',
+    'sqlite': 'school_core.cache_backends.SQLiteCache',
+}
+
+
+def _int(environ, name, default):
+    try:
+        return int(environ.get(name, default))
+    except ValueError:
+        raise ImproperlyConfigured(f'{name} doit être un entier : {environ[name]!r}')
+
+
+def cache_settings(environ, base_dir, profile='dev'):
+    """Valeur de CACHES pour ces variables d'environnement et ce profil"""
+    backend = environ.get('SCHOOL_CACHE_BACKEND', 'sqlite' if profile == 'prod' else 'locmem')
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(
+            f'SCHOOL_CACHE_BACKEND inconnu : {backend!r} (choix : {", ".join(BACKENDS)})'
+        )
+    if profile == 'prod' and backend == 'locmem':
+        raise ImproperlyConfigured(
+            'SCHOOL_CACHE_BACKEND=locmem est propre à chaque worker : utiliser file ou sqlite en production'
+        )
+    default_locations = {
+        'locmem': 'school',
+        'file': str(base_dir / 'var' / 'cache'),
+        'sqlite': str(base_dir / 'var' / 'cache.sqlite3'),
+    }
+    return {
+        'default': {
+            'BACKEND': BACKENDS[backend],
+            'LOCATION': environ.get('SCHOOL_CACHE_LOCATION') or default_locations[backend],
+            'TIMEOUT': _int(environ, 'SCHOOL_CACHE_TIMEOUT', 300),
+            'OPTIONS': {
+                'MAX_ENTRIES': _int(environ, 'SCHOOL_CACHE_MAX_ENTRIES', 10000),
+                # Nom sous lequel les succès / échecs sont comptés (school_core/cache_backends.py)
+                'METRICS_NAME': 'default',
+            },
+        },
+    }
@@ -0,0 +1,108 @@
+# config/database.py
+# Configuration de la base (DATABASES) à partir des variables d'environnement
+#
+# DATABASE_URL              postgres://utilisateur:mot-de-passe@hôte:5432/base?sslmode=require
+#                           ou sqlite:///chemin/relatif.sqlite3 (sqlite:////chemin/absolu) ;
+#                           défaut : db.sqlite3 à la racine du projet
+#                           SQLite passe en mode WAL en production ou avec une URL explicite ;
+#                           la base par défaut, suivie par git, reste en journal classique
+# TEST_DATABASE_URL         base des tests (profil test), SQLite par défaut
+# SCHOOL_DB_CONN_MAX_AGE    durée de vie des connexions persistantes, en secondes
+#                           (défaut : 60 en production, 0 sinon)
+# SCHOOL_DB_POOL            PostgreSQL : pool de connexions de Django (psycopg 3) ; par défaut
+#                           activé si psycopg_pool est installé, 0 pour le désactiver
+# SCHOOL_DB_POOL_MIN_SIZE / SCHOOL_DB_POOL_MAX_SIZE   taille du pool de chaque processus (2 / 10)
+
+import importlib.util
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+POSTGRES_SCHEMES = {'postgres', 'postgresql', 'pgsql'}
+
+# Exécutés à l'ouverture de chaque connexion SQLite. WAL : les lectures n'attendent
+# pas l'écriture en cours (workers, tâches de fond) ; synchronous=NORMAL suffit en WAL.
+# Le mode WAL est écrit dans le fichier de la base : il n'est demandé que par
+# database_settings() pour une base de production ou choisie explicitement.
+SQLITE_WAL_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+]
+SQLITE_PRAGMAS = [
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-20000',
+    'PRAGMA mmap_size=134217728',
+]
+
+
+def _int(environ, name, default):
+    try:
+        return int(environ.get(name, default))
+    except ValueError:
+        raise ImproperlyConfigured(f'{name} doit être un entier : {environ[name]!r}')
+
+
+def _sqlite(url, base_dir, wal=False):
+    path = unquote(url.path)[1:] if url.path.startswith('/') else unquote(url.path)
+    if not path or path == ':memory:' or url.netloc == ':memory:':
+        name = ':memory:'
+    else:
+        name = path if path.startswith('/') else base_dir / path
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'OPTIONS': {
+            'init_command': ';'.join((SQLITE_WAL_PRAGMAS if wal else []) + SQLITE_PRAGMAS),
+            # Verrou d'écriture pris dès le début de la transaction : pas de
+            # "database is locked" quand deux lectures veulent écrire en même temps
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+
+
+def _postgres(url, environ, conn_max_age):
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': unquote(url.path[1:]),
+        'USER': unquote(url.username or ''),
+        'PASSWORD': unquote(url.password or ''),
+        'HOST': url.hostname or '',
+        'PORT': str(url.port or ''),
+        'OPTIONS': dict(parse_qsl(url.query)),
+    }
+    use_pool = environ.get('SCHOOL_DB_POOL')
+    if use_pool is None:
+        use_pool = importlib.util.find_spec('psycopg_pool') is not None
+    else:
+        use_pool = use_pool not in ('0', 'false', 'False', '')
+    if use_pool:
+        database['OPTIONS']['pool'] = {
+            'min_size': _int(environ, 'SCHOOL_DB_POOL_MIN_SIZE', 2),
+            'max_size': _int(environ, 'SCHOOL_DB_POOL_MAX_SIZE', 10),
+        }
+        # Le pool garde les connexions ouvertes : Django refuse CONN_MAX_AGE en plus
+        conn_max_age = 0
+    database['CONN_MAX_AGE'] = conn_max_age
+    return database
+
+
+def database_settings(environ, base_dir, profile='dev'):
+    """Valeur de DATABASES pour ces variables d'environnement et ce profil"""
+    # Les tests gardent SQLite (base en mémoire créée par Django) sauf TEST_DATABASE_URL
+    variable = 'TEST_DATABASE_URL' if profile == 'test' else 'DATABASE_URL'
+    explicit_url = environ.get(variable)
+    url = urlsplit(explicit_url or 'sqlite:///db.sqlite3')
+    conn_max_age = _int(environ, 'SCHOOL_DB_CONN_MAX_AGE', 60 if profile == 'prod' else 0)
+
+    if url.scheme == 'sqlite':
+        database = _sqlite(url, base_dir, wal=profile == 'prod' or bool(explicit_url))
+        database['CONN_MAX_AGE'] = conn_max_age
+    elif url.scheme in POSTGRES_SCHEMES:
+        database = _postgres(url, environ, conn_max_age)
+    else:
+        raise ImproperlyConfigured(f'DATABASE_URL : base non prise en charge ({url.scheme!r}), postgres ou sqlite')
+
+    # Connexion vérifiée avant d'être réutilisée (redémarrage du serveur de base)
+    database['CONN_HEALTH_CHECKS'] = database['CONN_MAX_AGE'] > 0
+    return {'default': database}
@@ -10,22 +10,40 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
+from config.cache import cache_settings
+from config.database import database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Profil : SCHOOL_ENV=dev (défaut), test (défaut de `manage.py test`) ou prod
+SCHOOL_ENV = os.environ.get('SCHOOL_ENV') or ('test' if sys.argv[1:2] == ['test'] else 'dev')
+if SCHOOL_ENV not in ('dev', 'test', 'prod'):
+    raise ImproperlyConfigured(f'SCHOOL_ENV inconnu : {SCHOOL_ENV!r} (dev, test ou prod)')
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/6.0/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-6#r9n@3^10+17&2&q&@s*1pf8+3_3e3k1+$&%)y&@rod-xlp6y'
+SECRET_KEY = os.environ.get('SCHOOL_SECRET_KEY')
+if not SECRET_KEY:
+    if SCHOOL_ENV == 'prod':
+        raise ImproperlyConfigured('SCHOOL_SECRET_KEY est obligatoire en production')
+    SECRET_KEY = 'django-insecure-6#r9n@3^10+17&2&q&@s*1pf8+3_3e3k1+$&%)y&@rod-xlp6y'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# (avec DEBUG, chaque requête SQL est aussi gardée en mémoire)
+DEBUG = os.environ.get('SCHOOL_DEBUG', '1' if SCHOOL_ENV == 'dev' else '0') == '1'
 
-ALLOWED_HOSTS = []
+# Production : SCHOOL_ALLOWED_HOSTS=ecole.example.org,www.ecole.example.org
+ALLOWED_HOSTS = [host.strip() for host in os.environ.get('SCHOOL_ALLOWED_HOSTS', '').split(',') if host.strip()]
 
 
 # config/settings.py
@@ -50,6 +68,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'school_core.middleware.AccessContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -60,12 +79,19 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'interfaces' / 'templates'],  # Templates des interfaces
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Gabarits compilés une fois par processus (rechargés par runserver quand ils changent)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'school_core.context_processors.access',
             ],
         },
     },
@@ -77,12 +103,9 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# DATABASE_URL (défaut : db.sqlite3), connexions persistantes et pool PostgreSQL :
+# voir config/database.py
+DATABASES = database_settings(os.environ, BASE_DIR, SCHOOL_ENV)
 
 
 # Password validation
@@ -103,6 +126,10 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Tests : hachage rapide des mots de passe des comptes créés par chaque test
+if SCHOOL_ENV == 'test':
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
@@ -125,12 +152,17 @@ STATIC_URL = 'static/'
 
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
-import os
-
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Tâches de fond (school_core/tasks.py) : exécutées par `python manage.py run_worker`.
+# À True, elles sont exécutées dans la requête, après la transaction (sans worker).
+SCHOOL_TASKS_EAGER = False
+
 # Authentication settings
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/niveaux/'
-LOGOUT_REDIRECT_URL = '/accounts/login/'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = '/accounts/login/'
+# Cache partagé par les périmètres d'accès, listes de classes et fragments de gabarits.
+# Choisi par variables d'environnement (SCHOOL_CACHE_BACKEND, ...) : voir config/cache.py
+CACHES = cache_settings(os.environ, BASE_DIR, SCHOOL_ENV)
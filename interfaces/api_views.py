@@ -1,25 +1,163 @@
 # interfaces/api_views.py
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.utils.cache import patch_cache_control
 from django.contrib.auth.decorators import login_required
-from school_core.models import Classroom
+from school_core.models import Conversation
+from school_core.conditional import conditional_on_conversations, requested_conversation
+from school_core.fastjson import FastJsonResponse
+from school_core.feed import FEED_PAGE_SIZE, get_feed_page, serialize_post
+from school_core.gallery import GALLERY_PAGE_SIZE, gallery_posts, get_gallery_page, parse_month, serialize_gallery_post
+from school_core.read_states import mark_conversation_read, unread_counts
+from school_core.roster import classroom_rosters, roster_etag
+from school_core.search import search_posts
+from school_core.visibility import get_visible_conversation_or_404
 from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_POST
+from .views_parents import get_selected_child, parent_conversations
 
 
 @login_required
 def get_classroom_parents(request, classroom_id):
     """API pour récupérer les élèves d'une classe (pour inviter leurs parents)"""
-    classroom = get_object_or_404(Classroom, id=classroom_id)
+    if classroom_id not in request.access.taught_classroom_ids():
+        raise Http404('Classe introuvable')
+    return FastJsonResponse(classroom_rosters([classroom_id])[classroom_id])
+
+
+def _roster_params(request):
+    """(classes demandées et autorisées, avec identifiants des parents) ; ValueError si `ids` est invalide"""
+    requested = {int(classroom_id) for classroom_id in request.GET.get('ids', '').split(',') if classroom_id}
+    if not requested:
+        raise ValueError('ids')
+    return sorted(requested & request.access.taught_classroom_ids()), request.GET.get('parents') == '1'
+
+
+def _roster_etag(request):
+    try:
+        classroom_ids, with_parent_ids = _roster_params(request)
+    except ValueError:
+        return None
+    return roster_etag(classroom_ids, with_parent_ids)
+
+
+@login_required
+@condition(etag_func=_roster_etag)
+def get_classroom_rosters(request):
+    """
+    API des listes d'élèves de plusieurs classes, en une requête.
+
+    Paramètres GET : `ids` (identifiants des classes séparés par des virgules ;
+    celles hors du périmètre de l'utilisateur sont ignorées) et `parents=1`
+    (ajoute les identifiants des parents). Réponse 304 si l'ETag envoyé dans
+    If-None-Match correspond encore aux listes demandées.
+    """
+    try:
+        classroom_ids, with_parent_ids = _roster_params(request)
+    except ValueError:
+        return JsonResponse({'error': 'Paramètre ids invalide'}, status=400)
+    rosters = classroom_rosters(classroom_ids, with_parent_ids)
+    response = FastJsonResponse({'classrooms': {str(classroom_id): rosters[classroom_id] for classroom_id in classroom_ids}})
+    # Le navigateur revalide sa copie (If-None-Match) à chaque utilisation
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@login_required
+@conditional_on_conversations(requested_conversation, read_states=False)
+def get_conversation_posts(request, conversation_id):
+    """
+    API de défilement du fil d'une conversation.
+
+    Paramètres GET : `before` (publications plus anciennes), `after` (plus récentes)
+    et `limit`. Les curseurs sont ceux renvoyés par les réponses précédentes.
+    """
+    conversation = get_visible_conversation_or_404(request.access, conversation_id)
+    
+    try:
+        limit = int(request.GET.get('limit', FEED_PAGE_SIZE))
+        page = get_feed_page(
+            conversation,
+            before=request.GET.get('before') or None,
+            after=request.GET.get('after') or None,
+            limit=limit
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Paramètres de pagination invalides'}, status=400)
+    
+    return JsonResponse({
+        'posts': [serialize_post(post) for post in page['posts']],
+        'older_cursor': page['older_cursor'],
+        'newer_cursor': page['newer_cursor'],
+        'has_more': page['has_more'],
+    })
+
+
+@login_required
+@conditional_on_conversations(parent_conversations, read_states=False)
+def get_parent_photos(request):
+    """
+    API de défilement de la galerie de l'espace parent.
+
+    Paramètres GET : `month` (AAAA-MM, obligatoire), `child` (id d'un enfant),
+    `cursor` (renvoyé par la page précédente) et `limit`.
+    """
+    if not request.user.is_parent:
+        return JsonResponse({'error': 'Accès réservé aux parents'}, status=403)
     
-    # Récupérer tous les élèves de cette classe avec le nombre de parents
-    students = []
+    children = list(request.user.children.all().select_related('classroom'))
+    child = get_selected_child(request, children)
+    if request.GET.get('child') and child is None:
+        return JsonResponse({'error': 'Enfant inconnu'}, status=404)
     
-    for student in classroom.students.all():
-        parents_count = student.parents.count()
-        students.append({
-            'id': student.id,
-            'first_name': student.first_name,
-            'last_name': student.last_name,
-            'parents_count': parents_count
-        })
+    try:
+        month = parse_month(request.GET.get('month', ''))
+        limit = int(request.GET.get('limit', GALLERY_PAGE_SIZE))
+        page = get_gallery_page(
+            gallery_posts(request.user, child),
+            month,
+            before=request.GET.get('cursor') or None,
+            limit=limit
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Paramètres de pagination invalides'}, status=400)
+    
+    return JsonResponse({
+        'posts': [serialize_gallery_post(post) for post in page['posts']],
+        'cursor': page['cursor'],
+        'has_more': page['has_more'],
+    })
+
+
+@login_required
+@conditional_on_conversations(requested_conversation, read_states=False)
+def search_conversation_posts(request, conversation_id):
+    """API de recherche plein texte dans une conversation (résultats classés par pertinence)"""
+    conversation = get_visible_conversation_or_404(request.access, conversation_id)
     
-    return JsonResponse(students, safe=False)
+    query = request.GET.get('q', '').strip()
+    results = []
+    for post in search_posts(query, conversation=conversation) if query else []:
+        data = serialize_post(post)
+        data['snippet'] = str(post.search_snippet)
+        results.append(data)
+    return JsonResponse({'query': query, 'results': results})
+
+
+@login_required
+@conditional_on_conversations(lambda request: Conversation.objects.none())
+def get_unread_counts(request):
+    """API des pastilles "non lus" : {conversation_id: nombre} (une requête indexée)"""
+    counts = unread_counts(request.user)
+    return JsonResponse({
+        'conversations': {str(conversation_id): count for conversation_id, count in counts.items()},
+        'total': sum(counts.values()),
+    })
+
+
+@login_required
+@require_POST
+def mark_conversation_read_view(request, conversation_id):
+    """Marque une conversation comme lue (messages reçus en direct pendant la lecture)"""
+    conversation = get_object_or_404(Conversation, id=conversation_id, participants=request.user)
+    mark_conversation_read(request.user, conversation)
+    return JsonResponse({'conversation': conversation.id, 'unread_count': 0})
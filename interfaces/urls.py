@@ -22,15 +22,24 @@ urlpatterns = [
     path('administration/eleves/', views_admin.admin_students_list, name='admin_students_list'),
     path('administration/eleve/nouveau/', views_admin.admin_student_edit, name='admin_student_create'),
     path('administration/eleve/<int:student_id>/', views_admin.admin_student_edit, name='admin_student_edit'),
+    path('administration/autocomplete/parents/', views_admin.admin_autocomplete_parents, name='admin_autocomplete_parents'),
+    path('administration/autocomplete/eleves/', views_admin.admin_autocomplete_students, name='admin_autocomplete_students'),
     path('administration/niveaux/', views_admin.admin_levels_list, name='admin_levels_list'),
     path('administration/niveau/nouveau/', views_admin.admin_level_edit, name='admin_level_create'),
     path('administration/niveau/<int:level_id>/', views_admin.admin_level_edit, name='admin_level_edit'),
+    path('administration/cache/', views_admin.admin_cache_metrics, name='admin_cache_metrics'),
     
     # PAGE D'ACCUEIL PARENTS
     path('parents/', views_parents.parent_home, name='parent_home'),
     
     # API
     path('api/classroom/<int:classroom_id>/parents/', api_views.get_classroom_parents, name='api_classroom_parents'),
+    path('api/classrooms/roster/', api_views.get_classroom_rosters, name='api_classroom_rosters'),
+    path('api/conversation/<int:conversation_id>/posts/', api_views.get_conversation_posts, name='api_conversation_posts'),
+    path('api/conversation/<int:conversation_id>/search/', api_views.search_conversation_posts, name='api_conversation_search'),
+    path('api/conversation/<int:conversation_id>/read/', api_views.mark_conversation_read_view, name='api_conversation_read'),
+    path('api/conversations/unread/', api_views.get_unread_counts, name='api_unread_counts'),
+    path('api/parents/photos/', api_views.get_parent_photos, name='api_parent_photos'),
     
     # MATERNELLE - Interface Messenger
     path('maternelle/', views_maternelle.maternelle_dashboard, name='maternelle_dashboard'),
@@ -1,12 +1,20 @@
 # interfaces/views_admin.py
 # Panel administrateur personnalisé
 
+import os
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import get_user_model
-from django.db.models import Q, Count
-from school_core.models import SchoolLevel, Classroom, Student, Conversation, Post, Message
+from django.conf import settings
+from django.db.models import Q, Count, Prefetch
+from django.http import JsonResponse
+from school_core.cache_backends import cache_metrics
+from school_core.models import SchoolLevel, Classroom, Student, Post
+from school_core.pagination import paginate_keyset
+from school_core.stats import get_dashboard_stats
+from accounts.utils import name_search_q, user_search_q
 
 User = get_user_model()
 
@@ -16,6 +24,18 @@ def user_is_admin(user):
     return user.is_superuser or user.is_director
 
 
+def user_label(user):
+    """Libellé d'un compte dans les listes d'autocomplétion"""
+    full_name = user.get_full_name()
+    return f"{full_name} ({user.username})" if full_name else user.username
+
+
+def student_label(student):
+    """Libellé d'un élève dans les listes d'autocomplétion"""
+    classroom = student.classroom.name if student.classroom else "sans classe"
+    return f"{student.first_name} {student.last_name} - {classroom}"
+
+
 @login_required
 def admin_dashboard(request):
     """Tableau de bord principal du panel admin"""
@@ -23,17 +43,8 @@ def admin_dashboard(request):
         messages.error(request, "Accès refusé. Seuls les administrateurs peuvent accéder à cette page.")
         return redirect('niveau_selector')
     
-    # Statistiques
-    stats = {
-        'total_students': Student.objects.count(),
-        'total_teachers': User.objects.filter(is_teacher=True).count(),
-        'total_parents': User.objects.filter(is_parent=True).count(),
-        'total_classes': Classroom.objects.count(),
-        'total_levels': SchoolLevel.objects.count(),
-        'total_conversations': Conversation.objects.count(),
-        'total_posts': Post.objects.filter(is_published=True).count(),
-        'unread_messages': Message.objects.filter(is_read=False).count(),
-    }
+    # Statistiques (cache tenu à jour par les signaux, voir school_core/stats.py)
+    stats = get_dashboard_stats()
     
     # Activités récentes
     recent_posts = Post.objects.select_related('author', 'conversation').order_by('-created_at')[:5]
@@ -59,13 +70,10 @@ def admin_users_list(request):
     
     users = User.objects.all().order_by('-date_joined')
     
-    if search:
-        users = users.filter(
-            Q(username__icontains=search) |
-            Q(first_name__icontains=search) |
-            Q(last_name__icontains=search) |
-            Q(email__icontains=search)
-        )
+    # Recherche par préfixe sur les clés de nom indexées (sans accents)
+    condition = user_search_q(search) if search else None
+    if condition is not None:
+        users = users.filter(condition)
     
     if role == 'teacher':
         users = users.filter(is_teacher=True)
@@ -74,8 +82,11 @@ def admin_users_list(request):
     elif role == 'director':
         users = users.filter(is_director=True)
     
+    page = paginate_keyset(request, users, ['-date_joined', '-id'])
+    
     context = {
-        'users': users,
+        'users': page['items'],
+        'page': page,
         'search': search,
         'role': role,
     }
@@ -91,18 +102,18 @@ def admin_teachers_list(request):
     
     search = request.GET.get('search', '')
     
-    teachers = User.objects.filter(is_teacher=True).order_by('last_name', 'first_name')
+    teachers = User.objects.filter(is_teacher=True).prefetch_related('taught_classes').order_by('last_name', 'first_name')
     
-    if search:
-        teachers = teachers.filter(
-            Q(username__icontains=search) |
-            Q(first_name__icontains=search) |
-            Q(last_name__icontains=search) |
-            Q(email__icontains=search)
-        )
+    # Recherche par préfixe sur les clés de nom indexées (sans accents)
+    condition = user_search_q(search) if search else None
+    if condition is not None:
+        teachers = teachers.filter(condition)
+    
+    page = paginate_keyset(request, teachers, ['last_name', 'first_name', 'id'])
     
     context = {
-        'teachers': teachers,
+        'teachers': page['items'],
+        'page': page,
         'search': search,
     }
     return render(request, 'admin/teachers_list.html', context)
@@ -117,18 +128,21 @@ def admin_parents_list(request):
     
     search = request.GET.get('search', '')
     
-    parents = User.objects.filter(is_parent=True).prefetch_related('children').order_by('last_name', 'first_name')
+    # Classe de chaque enfant dans la même requête que les enfants
+    parents = User.objects.filter(is_parent=True).prefetch_related(
+        Prefetch('children', queryset=Student.objects.select_related('classroom'))
+    ).order_by('last_name', 'first_name')
     
-    if search:
-        parents = parents.filter(
-            Q(username__icontains=search) |
-            Q(first_name__icontains=search) |
-            Q(last_name__icontains=search) |
-            Q(email__icontains=search)
-        )
+    # Recherche par préfixe sur les clés de nom indexées (sans accents)
+    condition = user_search_q(search) if search else None
+    if condition is not None:
+        parents = parents.filter(condition)
+    
+    page = paginate_keyset(request, parents, ['last_name', 'first_name', 'id'])
     
     context = {
-        'parents': parents,
+        'parents': page['items'],
+        'page': page,
         'search': search,
     }
     return render(request, 'admin/parents_list.html', context)
@@ -273,11 +287,14 @@ def admin_parent_edit(request, parent_id=None):
         
         return redirect('admin_parents_list')
     
-    students = Student.objects.select_related('classroom').order_by('last_name', 'first_name')
+    # Seuls les enfants déjà liés sont chargés, les autres via l'autocomplétion
+    children = parent.children.select_related('classroom') if parent else []
     
     context = {
         'parent': parent,
-        'students': students,
+        'selected_children': [
+            {'id': student.id, 'label': student_label(student)} for student in children
+        ],
     }
     return render(request, 'admin/parent_edit.html', context)
 
@@ -334,8 +351,11 @@ def admin_classes_list(request):
     
     levels = SchoolLevel.objects.all()
     
+    page = paginate_keyset(request, classes, ['level_id', 'name', 'id'])
+    
     context = {
-        'classes': classes,
+        'classes': page['items'],
+        'page': page,
         'levels': levels,
         'selected_level': level_id,
         'search': search,
@@ -402,16 +422,18 @@ def admin_students_list(request):
     if class_id:
         students = students.filter(classroom_id=class_id)
     
-    if search:
-        students = students.filter(
-            Q(first_name__icontains=search) |
-            Q(last_name__icontains=search)
-        )
+    # Recherche par préfixe sur les clés de nom indexées (sans accents)
+    condition = name_search_q(search) if search else None
+    if condition is not None:
+        students = students.filter(condition)
     
     classes = Classroom.objects.select_related('level').order_by('level', 'name')
     
+    page = paginate_keyset(request, students, ['last_name', 'first_name', 'id'])
+    
     context = {
-        'students': students,
+        'students': page['items'],
+        'page': page,
         'classes': classes,
         'selected_class': class_id,
         'search': search,
@@ -459,12 +481,15 @@ def admin_student_edit(request, student_id=None):
         return redirect('admin_students_list')
     
     classrooms = Classroom.objects.select_related('level').order_by('level', 'name')
-    parents = User.objects.filter(is_parent=True).order_by('last_name', 'first_name')
+    # Seuls les parents déjà liés sont chargés, les autres via l'autocomplétion
+    parents = student.parents.all() if student else []
     
     context = {
         'student': student,
         'classrooms': classrooms,
-        'parents': parents,
+        'selected_parents': [
+            {'id': parent.id, 'label': user_label(parent)} for parent in parents
+        ],
     }
     return render(request, 'admin/student_edit.html', context)
 
@@ -520,3 +545,46 @@ def admin_level_edit(request, level_id=None):
         'level': level,
     }
     return render(request, 'admin/level_edit.html', context)
+
+
+# Nombre maximal de suggestions renvoyées par l'autocomplétion
+AUTOCOMPLETE_LIMIT = 20
+
+
+@login_required
+def admin_autocomplete_parents(request):
+    """Autocomplétion des parents (formulaire élève) : ?q=<début du prénom ou du nom>"""
+    if not user_is_admin(request.user):
+        return JsonResponse({'error': 'Accès refusé'}, status=403)
+    
+    condition = user_search_q(request.GET.get('q', ''))
+    if condition is None:
+        return JsonResponse({'results': []})
+    parents = User.objects.filter(condition, is_parent=True).order_by('last_name_key')[:AUTOCOMPLETE_LIMIT]
+    return JsonResponse({'results': [{'id': parent.id, 'label': user_label(parent)} for parent in parents]})
+
+
+@login_required
+def admin_autocomplete_students(request):
+    """Autocomplétion des élèves (formulaire parent) : ?q=<début du prénom ou du nom>"""
+    if not user_is_admin(request.user):
+        return JsonResponse({'error': 'Accès refusé'}, status=403)
+    
+    condition = name_search_q(request.GET.get('q', ''))
+    if condition is None:
+        return JsonResponse({'results': []})
+    students = Student.objects.filter(condition).select_related('classroom').order_by('last_name_key')[:AUTOCOMPLETE_LIMIT]
+    return JsonResponse({'results': [{'id': student.id, 'label': student_label(student)} for student in students]})
+
+
+@login_required
+def admin_cache_metrics(request):
+    """Succès / échecs du cache depuis le démarrage du processus qui répond"""
+    if not user_is_admin(request.user):
+        return JsonResponse({'error': 'Accès refusé'}, status=403)
+    
+    return JsonResponse({
+        'backend': settings.CACHES['default']['BACKEND'],
+        'process': os.getpid(),
+        'caches': cache_metrics(),
+    })
@@ -5,48 +5,37 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages as django_messages
 from school_core.models import SchoolLevel, Classroom, Post, Student, Conversation
+from school_core.conditional import conditional_on_conversations, level_conversations
+from school_core.feed import get_feed_page, serialize_post
+from school_core.fragments import messenger_fragments
+from school_core.membership import add_student_parents, students_with_membership
+from school_core.read_states import mark_conversation_read, with_unread_counts
+from school_core.realtime import publish_post
+from school_core.visibility import get_visible_conversation_or_404, visible_conversations
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
-from django.db.models import Q
-from django.utils import timezone
 
 
 @login_required
+@conditional_on_conversations(level_conversations('maternelle'))
 def maternelle_dashboard(request):
     """Interface Messenger - Conversations de groupe et privées"""
     level = get_object_or_404(SchoolLevel, slug='maternelle')
+    if not request.access.can_access_level(level):
+        django_messages.error(request, "Vous n'avez pas accès à ce niveau")
+        return redirect('niveau_selector')
     
     # Récupérer toutes les conversations de l'utilisateur
     # Les directeurs voient toutes les conversations du niveau
-    if request.user.is_director:
-        conversations = Conversation.objects.filter(
-            Q(classroom__level=level) | Q(classroom__isnull=True, participants__children__classroom__level=level)
-        ).distinct().order_by('-last_message_at')[:50]
-    else:
-        conversations = Conversation.objects.filter(
-            Q(participants=request.user) | Q(created_by=request.user)
-        ).filter(
-            Q(classroom__level=level) | Q(classroom__isnull=True, participants__children__classroom__level=level)
-        ).distinct().order_by('-last_message_at')[:50]
+    conversations = visible_conversations(request.user, level).order_by('-last_message_at')[:50]
     
     # Conversation sélectionnée
     conversation_id = request.GET.get('conv')
     if conversation_id:
-        if request.user.is_director:
-            selected_conversation = get_object_or_404(Conversation, id=conversation_id)
-        else:
-            selected_conversation = get_object_or_404(Conversation, id=conversation_id, participants=request.user)
+        selected_conversation = get_visible_conversation_or_404(request.access, conversation_id)
     else:
         selected_conversation = conversations.first() if conversations.exists() else None
     
-    # Posts de la conversation sélectionnée
-    posts = []
-    if selected_conversation:
-        posts = Post.objects.filter(
-            conversation=selected_conversation,
-            is_published=True
-        ).select_related('author').order_by('-created_at')[:100]
-    
     # Envoi de message/photo (POST)
     if request.method == 'POST' and selected_conversation:
         description = request.POST.get('description', '').strip()
@@ -56,34 +45,49 @@ def maternelle_dashboard(request):
                 conversation=selected_conversation,
                 image=request.FILES.get('image'),
                 description=description,
-                title=request.POST.get('title', '')
+                title=request.POST.get('title', ''),
+                # La photo est déclinée en tâche de fond (voir school_core/tasks.py)
+                status='processing' if 'image' in request.FILES else 'ready'
             )
-            # Mettre à jour last_message_at
-            selected_conversation.last_message_at = timezone.now()
-            selected_conversation.save()
+            # Mettre à jour le résumé (last_message_at, compteur, aperçu)
+            selected_conversation.register_post(post)
+            publish_post(post)
+            # Envoi depuis le messenger (fetch) : pas de rechargement de la page
+            if 'application/json' in request.headers.get('Accept', ''):
+                return JsonResponse(serialize_post(post), status=201)
             django_messages.success(request, '✉️ Message envoyé avec succès !')
             return redirect(f'/niveaux/maternelle/?conv={selected_conversation.id}')
     
-    # Classes disponibles (pour créer des conversations)
-    if request.user.is_director:
-        # Directeurs: toutes les classes du niveau
-        classrooms = Classroom.objects.filter(level=level)
-    elif request.user.is_teacher:
-        classrooms = request.user.taught_classes.filter(level=level)
-    elif request.user.is_parent:
-        children = request.user.children.filter(classroom__level=level)
-        classrooms = Classroom.objects.filter(level=level, students__in=children).distinct()
-    else:
-        classrooms = Classroom.objects.filter(level=level)
+    # Conversation ouverte = lue ; pastilles "non lus" de la liste (une requête)
+    if selected_conversation:
+        mark_conversation_read(request.user, selected_conversation)
+    conversations = with_unread_counts(conversations, request.user)
+    
+    # Posts de la conversation sélectionnée (première page uniquement,
+    # la suite est chargée au défilement via l'API)
+    posts = []
+    older_cursor = None
+    newer_cursor = None
+    if selected_conversation:
+        page = get_feed_page(selected_conversation)
+        posts = page['posts']
+        older_cursor = page['older_cursor']
+        newer_cursor = page['newer_cursor']
+    
+    # Classes proposées pour créer une conversation : celles de l'enseignant
+    # (toutes pour les directeurs), lues dans son périmètre en cache
+    classrooms = Classroom.objects.filter(id__in=request.access.taught_classroom_ids(level))
     
     context = {
         'level': level,
         'conversations': conversations,
         'selected_conversation': selected_conversation,
         'posts': posts,
+        'older_cursor': older_cursor,
+        'newer_cursor': newer_cursor,
         'can_post': True,  # Tout le monde peut poster
         'classrooms': classrooms,
-        'can_create_conversation': request.user.is_teacher or request.user.is_director,
+        'fragments': messenger_fragments(conversations, selected_conversation),
     }
     return render(request, 'maternelle/messenger.html', context)
 
@@ -91,7 +95,7 @@ def maternelle_dashboard(request):
 @login_required
 def create_conversation(request):
     """Créer une nouvelle conversation privée (enseignants et directeurs uniquement)"""
-    if not (request.user.is_teacher or request.user.is_director):
+    if not request.access.can_create_conversation:
         django_messages.error(request, "Seuls les enseignants et directeurs peuvent créer des conversations")
         return redirect('/niveaux/maternelle/')
     
@@ -117,22 +121,18 @@ def create_conversation(request):
         conversation.participants.add(request.user)
         
         # Ajouter les parents des élèves sélectionnés
-        for student_id in student_ids:
-            student = Student.objects.get(id=student_id)
-            for parent in student.parents.all():
-                conversation.participants.add(parent)
+        add_student_parents(conversation, student_ids)
         
         django_messages.success(request, f"💬 Conversation créée avec {len(student_ids)} élève(s) !")
         return redirect(f'/niveaux/maternelle/?conv={conversation.id}')
     
     # GET: afficher le formulaire avec tous les élèves du niveau
-    if request.user.is_director:
-        classrooms = Classroom.objects.filter(level=level)
-    else:
-        classrooms = request.user.taught_classes.filter(level=level)
+    classrooms = Classroom.objects.filter(id__in=request.access.taught_classroom_ids(level))
     
     # Récupérer tous les élèves des classes du niveau
-    students = Student.objects.filter(classroom__in=classrooms).select_related('classroom').order_by('classroom__name', 'last_name', 'first_name')
+    students = students_with_membership(
+        Student.objects.filter(classroom__in=classrooms).select_related('classroom')
+    ).order_by('classroom__name', 'last_name', 'first_name')
     
     context = {
         'level': level,
@@ -148,7 +148,7 @@ def add_participants(request, conversation_id):
     conversation = get_object_or_404(Conversation, id=conversation_id)
     
     # Vérifier que l'utilisateur peut modifier cette conversation
-    if not (request.user.is_director or conversation.created_by == request.user or request.user in conversation.participants.all()):
+    if not request.access.can_view_conversation(conversation):
         django_messages.error(request, "Vous n'avez pas la permission de modifier cette conversation")
         return redirect(f'/niveaux/maternelle/?conv={conversation.id}')
     
@@ -162,13 +162,7 @@ def add_participants(request, conversation_id):
             return redirect(f'/niveaux/maternelle/conversation/{conversation_id}/add-participants/')
         
         # Ajouter les parents des élèves sélectionnés
-        added_count = 0
-        for student_id in student_ids:
-            student = Student.objects.get(id=student_id)
-            for parent in student.parents.all():
-                if parent not in conversation.participants.all():
-                    conversation.participants.add(parent)
-                    added_count += 1
+        added_count = add_student_parents(conversation, student_ids)
         
         if added_count > 0:
             django_messages.success(request, f"✅ {added_count} participant(s) ajouté(s) à la conversation")
@@ -178,14 +172,14 @@ def add_participants(request, conversation_id):
         return redirect(f'/niveaux/maternelle/?conv={conversation.id}')
     
     # GET: afficher le formulaire
-    if request.user.is_director:
-        classrooms = Classroom.objects.filter(level=level)
-    else:
-        classrooms = request.user.taught_classes.filter(level=level)
+    classrooms = Classroom.objects.filter(id__in=request.access.taught_classroom_ids(level))
     
     # Récupérer tous les élèves du niveau dont les parents ne sont pas encore dans la conversation
     current_participants = conversation.participants.all()
-    students = Student.objects.filter(classroom__in=classrooms).select_related('classroom').order_by('classroom__name', 'last_name', 'first_name')
+    students = students_with_membership(
+        Student.objects.filter(classroom__in=classrooms).select_related('classroom'),
+        conversation
+    ).order_by('classroom__name', 'last_name', 'first_name')
     
     context = {
         'level': level,
@@ -1,37 +1,64 @@
 # interfaces/views_parents.py
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from school_core.models import Post, Conversation
-from django.db.models import Q
+from school_core.models import Conversation
+from school_core.conditional import conditional_on_conversations
+from school_core.gallery import get_gallery_page, gallery_months, gallery_posts, month_key, parse_month
+
+
+def get_selected_child(request, children):
+    """Enfant choisi via ?child=<id> parmi les enfants du parent, sinon None"""
+    child_id = request.GET.get('child')
+    for child in children:
+        if str(child.id) == child_id:
+            return child
+    return None
+
+
+def parent_conversations(request, *args, **kwargs):
+    """Conversations du parent (validateur des réponses conditionnelles), None pour un autre rôle"""
+    if not request.user.is_parent:
+        return None
+    memberships = Conversation.participants.through.objects.filter(customuser_id=request.user.id)
+    return Conversation.objects.filter(id__in=memberships.values('conversation_id'))
 
 
 @login_required
+@conditional_on_conversations(parent_conversations, read_states=False)
 def parent_home(request):
-    """Page d'accueil pour les parents avec toutes les photos envoyées"""
-    
+    """Page d'accueil pour les parents : galerie des photos, mois par mois"""
+
     # Rediriger si ce n'est pas un parent
     if not request.user.is_parent:
         return redirect('niveau_selector')
-    
-    # Récupérer toutes les conversations du parent
-    conversations = Conversation.objects.filter(
-        participants=request.user
-    ).prefetch_related('posts', 'classroom', 'classroom__level')
-    
-    # Récupérer tous les posts des conversations du parent
-    posts = Post.objects.filter(
-        conversation__participants=request.user,
-        image__isnull=False  # Seulement les posts avec photo
-    ).exclude(image='').select_related('author', 'conversation', 'conversation__classroom').order_by('-created_at')
-    
+
+    # Conversations du parent (les compteurs viennent du résumé dénormalisé)
+    conversations = list(Conversation.objects.filter(participants=request.user))
+
     # Récupérer les enfants du parent
-    children = request.user.children.all().select_related('classroom', 'classroom__level')
-    
+    children = list(request.user.children.all().select_related('classroom', 'classroom__level'))
+    selected_child = get_selected_child(request, children)
+
+    # Photos du mois demandé (par défaut le plus récent), la suite est chargée via l'API
+    posts = gallery_posts(request.user, selected_child)
+    months = gallery_months(posts)
+    selected_month = months[0] if months else None
+    try:
+        if request.GET.get('month'):
+            selected_month = parse_month(request.GET['month'])
+    except ValueError:
+        pass
+    page = get_gallery_page(posts, selected_month) if selected_month else {'posts': [], 'cursor': None}
+
     context = {
-        'posts': posts,
+        'posts': page['posts'],
+        'next_cursor': page['cursor'],
+        'months': [{'key': month_key(month), 'date': month} for month in months],
+        'selected_month': month_key(selected_month) if selected_month else '',
         'conversations': conversations,
         'children': children,
-        'total_posts': posts.count(),
+        'selected_child': selected_child,
+        'total_posts': sum(conversation.post_count for conversation in conversations),
     }
-    
+
     return render(request, 'parents/home.html', context)
@@ -0,0 +1,200 @@
+# school_core/access.py
+# Périmètre de chaque utilisateur (niveaux, classes, conversations), conservé dans le cache
+#
+# Un utilisateur accède aux niveaux des classes où il enseigne et de celles de
+# ses enfants (les deux rôles se cumulent) ; directeurs et superutilisateurs
+# accèdent à tous les niveaux et à toutes les classes. Les conversations sont
+# celles dont il est participant ou créateur (les directeurs les voient toutes).
+#
+# Le périmètre est calculé en trois requêtes au plus et mis en cache par
+# utilisateur ; les signaux (school_core/signals.py) l'invalident quand une
+# inscription, un enseignement, un rôle ou une participation change.
+# AccessContextMiddleware (school_core/middleware.py) le met à disposition des
+# vues (`request.access`) et des gabarits (`access`) sous forme d'AccessContext.
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .models import Classroom, Conversation, SchoolLevel
+
+CACHE_PREFIX = 'user_access:'
+# Incrémenté quand un niveau ou une classe est créé, modifié ou supprimé :
+# invalide toutes les entrées
+GENERATION_KEY = f'{CACHE_PREFIX}generation'
+ACCESS_TIMEOUT = getattr(settings, 'SCHOOL_ACCESS_TIMEOUT', 24 * 3600)
+
+EMPTY_SCOPE = {
+    'levels': frozenset(),
+    'classrooms': {},
+    'taught': frozenset(),
+    'conversations': frozenset(),
+    'version': '',
+}
+
+
+def _key(user_id):
+    return f'{CACHE_PREFIX}{user_id}'
+
+
+def compute_user_scope(user):
+    """
+    Périmètre de l'utilisateur, calculé sans cache :
+    - `levels` : niveaux accessibles ;
+    - `classrooms` : {classe: niveau} des classes enseignées et de celles des
+      enfants (toutes pour les directeurs et superutilisateurs) ;
+    - `taught` : classes enseignées ;
+    - `conversations` : conversations dont il est participant ou créateur ;
+    - `version` : empreinte du contenu (validateur des réponses conditionnelles).
+    """
+    classrooms = Classroom.objects.all()
+    sees_all = user.is_superuser or user.is_director
+    if not sees_all:
+        classrooms = classrooms.filter(Q(teacher_id=user.pk) | Q(students__parents=user.pk))
+    rows = set(classrooms.values_list('id', 'level_id', 'teacher_id').distinct())
+
+    classroom_levels = {classroom_id: level_id for classroom_id, level_id, _ in rows}
+    if sees_all:
+        # Y compris les niveaux qui n'ont pas encore de classe
+        levels = frozenset(SchoolLevel.objects.values_list('id', flat=True))
+    else:
+        levels = frozenset(classroom_levels.values())
+
+    memberships = Conversation.participants.through.objects.filter(customuser_id=user.pk)
+    conversations = Conversation.objects.filter(
+        Q(id__in=memberships.values('conversation_id')) | Q(created_by_id=user.pk)
+    )
+    scope = {
+        'levels': levels,
+        'classrooms': classroom_levels,
+        'taught': frozenset(classroom_id for classroom_id, _, teacher_id in rows if teacher_id == user.pk),
+        'conversations': frozenset(conversations.values_list('id', flat=True)),
+    }
+    scope['version'] = scope_version(user, scope)
+    return scope
+
+
+def scope_version(user, scope):
+    """
+    Empreinte du périmètre et des rôles : la même pour un même contenu, quel
+    que soit le worker ou le moment du calcul (les ETag restent valides après
+    une expiration du cache)
+    """
+    signature = repr([
+        user.pk, user.is_superuser, user.is_director, user.is_teacher, user.is_parent,
+        sorted(scope['levels']), sorted(scope['classrooms'].items()),
+        sorted(scope['taught']), sorted(scope['conversations']),
+    ])
+    return hashlib.md5(signature.encode()).hexdigest()
+
+
+def user_scope(user):
+    """Périmètre de l'utilisateur (lu dans le cache si possible)"""
+    if not user.is_authenticated:
+        return EMPTY_SCOPE
+    cached = cache.get_many([_key(user.pk), GENERATION_KEY])
+    generation = cached.get(GENERATION_KEY, 0)
+    entry = cached.get(_key(user.pk))
+    if entry is not None and entry[0] == generation:
+        return entry[1]
+    scope = compute_user_scope(user)
+    cache.set(_key(user.pk), (generation, scope), ACCESS_TIMEOUT)
+    return scope
+
+
+def accessible_level_ids(user):
+    """Identifiants des niveaux accessibles à l'utilisateur"""
+    return user_scope(user)['levels']
+
+
+def has_level_access(user, level):
+    return level.id in accessible_level_ids(user)
+
+
+def invalidate_access(user_ids):
+    """
+    Le périmètre de ces utilisateurs sera recalculé à la prochaine lecture.
+    Supprimé tout de suite (lectures de la transaction en cours) et de nouveau
+    après validation : un périmètre recalculé entre-temps par une autre requête,
+    à partir des lignes pas encore validées, n'est pas gardé.
+    """
+    keys = [_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _next_generation():
+    if not cache.add(GENERATION_KEY, 1, None):
+        cache.incr(GENERATION_KEY)
+
+
+def invalidate_all_access():
+    """Un niveau ou une classe a changé : toutes les entrées deviennent obsolètes (maintenant et après validation)"""
+    _next_generation()
+    transaction.on_commit(_next_generation)
+
+
+class AccessContext:
+    """
+    Ce que l'utilisateur d'une requête peut voir et faire. Le périmètre est lu
+    une seule fois par requête, au premier besoin.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def scope(self):
+        return user_scope(self.user)
+
+    @property
+    def is_director(self):
+        return self.user.is_authenticated and self.user.is_director
+
+    @property
+    def can_create_conversation(self):
+        return self.user.is_authenticated and (self.user.is_teacher or self.user.is_director)
+
+    @property
+    def level_ids(self):
+        return self.scope['levels']
+
+    def can_access_level(self, level):
+        return getattr(level, 'id', level) in self.level_ids
+
+    def classroom_ids(self, level=None):
+        """Classes de l'utilisateur (toutes pour un directeur), éventuellement d'un seul niveau"""
+        classrooms = self.scope['classrooms']
+        if level is None:
+            return set(classrooms)
+        level_id = getattr(level, 'id', level)
+        return {classroom_id for classroom_id, classroom_level in classrooms.items() if classroom_level == level_id}
+
+    def taught_classroom_ids(self, level=None):
+        """Classes où l'utilisateur peut inviter des parents : les siennes, toutes pour un directeur"""
+        if self.is_director:
+            return self.classroom_ids(level)
+        return self.classroom_ids(level) & self.scope['taught']
+
+    @property
+    def version(self):
+        return self.scope['version']
+
+    @property
+    def conversation_ids(self):
+        return self.scope['conversations']
+
+    def can_view_conversation(self, conversation):
+        """Conversation (ou identifiant) visible : participant, créateur ou directeur"""
+        if self.is_director:
+            return True
+        try:
+            conversation_id = int(getattr(conversation, 'id', conversation))
+        except (TypeError, ValueError):
+            return False
+        return conversation_id in self.conversation_ids
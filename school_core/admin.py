@@ -1,9 +1,35 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from django.db.models import Count
+from django.db.models import Count, Prefetch
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.safestring import mark_safe
-from .models import SchoolLevel, Classroom, Student, Post, Message, Conversation
+from accounts.models import CustomUser
+from .models import SchoolLevel, Classroom, Student, Post, Message, Conversation, Task
+from .images import variant_url
+from .read_states import refresh_unread_counts
+from .search import search_ids
+from .summaries import refresh_conversation_summaries
+
+
+class FullTextSearchMixin:
+    """
+    Recherche de l'admin : le texte (titre, contenu...) passe par l'index plein
+    texte (school_core/search.py) ; search_fields ne couvre que les noms, par préfixe.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            results = results | queryset.filter(id__in=search_ids(self.model, search_term))
+        return results, may_have_duplicates
+
+
+class ClassroomListFilter(admin.RelatedFieldListFilter):
+    """Filtre par classe : le libellé "Classe (Niveau)" charge les niveaux dans la même requête"""
+
+    def field_choices(self, field, request, model_admin):
+        return [(classroom.pk, str(classroom)) for classroom in Classroom.objects.select_related('level')]
 
 
 @admin.register(SchoolLevel)
@@ -27,16 +53,24 @@ class SchoolLevelAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         return request.user.is_superuser or request.user.is_director
     
+    # Les compteurs sont calculés par la requête de la liste (un GROUP BY), pas ligne par ligne
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            classroom_total=Count('classrooms', distinct=True),
+            student_total=Count('classrooms__students', distinct=True)
+        )
+    
     def classroom_count(self, obj):
-        count = obj.classrooms.count()
+        count = obj.classroom_total
         url = reverse('admin:school_core_classroom_changelist') + f'?level__id__exact={obj.id}'
         return format_html('<a href="{}">{} classe(s)</a>', url, count)
     classroom_count.short_description = 'Classes'
+    classroom_count.admin_order_field = 'classroom_total'
     
     def student_count(self, obj):
-        count = Student.objects.filter(classroom__level=obj).count()
-        return f"{count} élève(s)"
+        return f"{obj.student_total} élève(s)"
     student_count.short_description = 'Élèves'
+    student_count.admin_order_field = 'student_total'
 
 
 @admin.register(Classroom)
@@ -71,6 +105,11 @@ class ClassroomAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('level', 'teacher').annotate(
+            student_total=Count('students')
+        )
+    
     def teacher_link(self, obj):
         if obj.teacher:
             url = reverse('admin:accounts_customuser_change', args=[obj.teacher.id])
@@ -82,16 +121,16 @@ class ClassroomAdmin(admin.ModelAdmin):
     teacher_link.short_description = 'Professeur'
     
     def student_count(self, obj):
-        count = obj.students.count()
         url = reverse('admin:school_core_student_changelist') + f'?classroom__id__exact={obj.id}'
-        return format_html('<a href="{}">{} élève(s)</a>', url, count)
+        return format_html('<a href="{}">{} élève(s)</a>', url, obj.student_total)
     student_count.short_description = 'Élèves'
+    student_count.admin_order_field = 'student_total'
 
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ['last_name', 'first_name', 'classroom_link', 'level', 'parent_count', 'age', 'photo_preview']
-    list_filter = ['classroom__level', 'classroom']
+    list_filter = ['classroom__level', ('classroom', ClassroomListFilter)]
     search_fields = ['first_name', 'last_name', 'parents__username', 'parents__first_name', 'parents__last_name']
     filter_horizontal = ['parents']
     autocomplete_fields = ['classroom']
@@ -125,6 +164,12 @@ class StudentAdmin(admin.ModelAdmin):
         }),
     )
     
+    # Les parents de toute la page sont chargés en une requête (prefetch)
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('parents', queryset=CustomUser.objects.only('id', 'username', 'first_name', 'last_name'))
+        )
+    
     def classroom_link(self, obj):
         if obj.classroom:
             url = reverse('admin:school_core_classroom_change', args=[obj.classroom.id])
@@ -137,10 +182,10 @@ class StudentAdmin(admin.ModelAdmin):
     level.short_description = 'Niveau'
     
     def parent_count(self, obj):
-        count = obj.parents.count()
-        if count > 0:
-            parents_list = ", ".join([p.get_full_name() or p.username for p in obj.parents.all()])
-            return format_html('<span title="{}">{} parent(s)</span>', parents_list, count)
+        parents = obj.parents.all()
+        if parents:
+            parents_list = ", ".join([p.get_full_name() or p.username for p in parents])
+            return format_html('<span title="{}">{} parent(s)</span>', parents_list, len(parents))
         return "0 parent"
     parent_count.short_description = 'Parents'
     
@@ -155,16 +200,16 @@ class StudentAdmin(admin.ModelAdmin):
     
     def photo_preview(self, obj):
         if obj.photo:
-            return format_html('<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 5px;" />', obj.photo.url)
+            return format_html('<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 5px;" loading="lazy" />', variant_url(obj.photo, 'thumb'))
         return "-"
     photo_preview.short_description = 'Photo'
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['title', 'conversation_link', 'author_link', 'created_at', 'is_published', 'has_image']
     list_filter = ['conversation__conversation_type', 'is_published', 'created_at', 'conversation__classroom__level']
-    search_fields = ['title', 'description', 'author__username', 'author__first_name', 'author__last_name']
+    search_fields = ['^author__username', '^author__first_name', '^author__last_name']
     date_hierarchy = 'created_at'
     readonly_fields = ['created_at', 'image_preview']
     list_editable = ['is_published']
@@ -198,6 +243,30 @@ class PostAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('conversation', 'author')
+    
+    # Garder le résumé des conversations et les compteurs non lus cohérents après une modification depuis l'admin
+    def save_model(self, request, obj, form, change):
+        previous_conversation_id = form.initial.get('conversation') if change else None
+        super().save_model(request, obj, form, change)
+        conversation_ids = {obj.conversation_id, previous_conversation_id} - {None}
+        refresh_conversation_summaries(conversation_ids)
+        refresh_unread_counts(conversation_ids)
+    
+    def delete_model(self, request, obj):
+        conversation_id = obj.conversation_id
+        super().delete_model(request, obj)
+        if conversation_id:
+            refresh_conversation_summaries([conversation_id])
+            refresh_unread_counts([conversation_id])
+    
+    def delete_queryset(self, request, queryset):
+        conversation_ids = set(queryset.exclude(conversation=None).values_list('conversation_id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_conversation_summaries(conversation_ids)
+        refresh_unread_counts(conversation_ids)
+    
     def conversation_link(self, obj):
         if obj.conversation:
             url = reverse('admin:school_core_conversation_change', args=[obj.conversation.id])
@@ -220,17 +289,17 @@ class PostAdmin(admin.ModelAdmin):
     
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="max-width: 300px; max-height: 300px;" />', obj.image.url)
+            return format_html('<img src="{}" style="max-width: 300px; max-height: 300px;" />', variant_url(obj.image, 'feed'))
         return "Aucune image"
     image_preview.short_description = 'Aperçu'
 
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['subject', 'sender_link', 'recipient_link', 'created_at', 'is_read', 'read_status']
     list_filter = ['is_read', 'created_at']
-    search_fields = ['subject', 'content', 'sender__username', 'recipient__username', 
-                    'sender__first_name', 'sender__last_name', 'recipient__first_name', 'recipient__last_name']
+    search_fields = ['^sender__username', '^recipient__username',
+                    '^sender__first_name', '^sender__last_name', '^recipient__first_name', '^recipient__last_name']
     date_hierarchy = 'created_at'
     readonly_fields = ['created_at']
     autocomplete_fields = ['sender', 'recipient']
@@ -252,6 +321,9 @@ class MessageAdmin(admin.ModelAdmin):
         # Les directeurs ne peuvent pas supprimer les messages
         return request.user.is_superuser
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('sender', 'recipient')
+    
     def sender_link(self, obj):
         url = reverse('admin:accounts_customuser_change', args=[obj.sender.id])
         return format_html('<a href="{}">{}</a>', url, obj.sender.get_full_name() or obj.sender.username)
@@ -316,6 +388,10 @@ class ConversationAdmin(admin.ModelAdmin):
         return "-"
     classroom_link.short_description = 'Classe'
     
+    def get_queryset(self, request):
+        # participant_count / post_count sont des colonnes dénormalisées : rien à compter
+        return super().get_queryset(request).select_related('classroom', 'created_by')
+    
     def created_by_link(self, obj):
         if obj.created_by:
             url = reverse('admin:accounts_customuser_change', args=[obj.created_by.id])
@@ -324,14 +400,16 @@ class ConversationAdmin(admin.ModelAdmin):
     created_by_link.short_description = 'Créé par'
     
     def participant_count(self, obj):
-        return obj.participants.count()
+        return obj.participant_count
     participant_count.short_description = 'Participants'
+    participant_count.admin_order_field = 'participant_count'
     
     def post_count(self, obj):
-        count = obj.posts.count()
+        count = obj.post_count
         url = reverse('admin:school_core_post_changelist') + f'?conversation__id__exact={obj.id}'
         return format_html('<a href="{}">{} post(s)</a>', url, count)
     post_count.short_description = 'Publications'
+    post_count.admin_order_field = 'post_count'
     
     def participant_list(self, obj):
         participants = obj.participants.all()
@@ -350,3 +428,32 @@ class ConversationAdmin(admin.ModelAdmin):
             return mark_safe(html)
         return "Aucun participant"
     participant_list.short_description = 'Liste des participants'
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'max_attempts', 'run_after', 'updated_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['name', 'payload', 'attempts', 'last_error', 'created_at', 'updated_at']
+    date_hierarchy = 'created_at'
+    actions = ['retry_tasks']
+    
+    def has_module_permission(self, request):
+        return request.user.is_superuser or request.user.is_director
+    
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser or request.user.is_director
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return request.user.is_superuser or request.user.is_director
+    
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_superuser
+    
+    def retry_tasks(self, request, queryset):
+        updated = queryset.filter(status='failed').update(status='pending', attempts=0, run_after=timezone.now())
+        self.message_user(request, f"{updated} tâche(s) remise(s) en file.")
+    retry_tasks.short_description = "↩️ Relancer les tâches en échec"
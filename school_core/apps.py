@@ -5,3 +5,6 @@ class SchoolCoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'school_core'
     verbose_name = 'Gestion Scolaire'
+
+    def ready(self):
+        from . import signals  # noqa: F401
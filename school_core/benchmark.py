@@ -0,0 +1,120 @@
+# school_core/benchmark.py
+# Mesure des vues : nombre de requêtes SQL, lectures du cache, temps de réponse, pic de mémoire
+#
+# Utilisé par la commande `python manage.py benchmark`, qui génère une école
+# fictive (school_core/synthetic.py) dans une base temporaire et écrit un
+# rapport JSON à comparer d'une version à l'autre.
+
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .cache_backends import cache_metrics
+
+
+def benchmark_scenarios(school):
+    """
+    [(nom, utilisateur, url)] des vues mesurées, pour une école créée par
+    synthetic.build_school().
+    """
+    director = school['director']
+    parent = school['parent']
+    scenarios = [
+        ('niveau_selector', parent, reverse('niveau_selector')),
+        ('parent_home', parent, reverse('parent_home')),
+    ]
+    for slug, teacher in school['teachers'].items():
+        scenarios.append((f'{slug}_dashboard', teacher, reverse(f'{slug}_dashboard')))
+    scenarios.append(('maternelle_dashboard (directeur)', director, reverse('maternelle_dashboard')))
+    # Copie du navigateur encore valide (If-None-Match) : réponse 304
+    scenarios.append(('maternelle_dashboard (revalidation)', school['teachers']['maternelle'], reverse('maternelle_dashboard')))
+    classroom = school['classrooms']['maternelle']
+    scenarios.append((
+        'get_classroom_parents', classroom.teacher, reverse('api_classroom_parents', args=[classroom.id])
+    ))
+    classroom_ids = ','.join(str(classroom.id) for classroom in school['classrooms'].values())
+    scenarios.append((
+        'classroom_rosters (directeur)', director, f"{reverse('api_classroom_rosters')}?ids={classroom_ids}&parents=1"
+    ))
+    for name in [
+        'admin_dashboard', 'admin_users_list', 'admin_teachers_list', 'admin_parents_list',
+        'admin_classes_list', 'admin_students_list', 'admin_levels_list',
+    ]:
+        scenarios.append((name, director, reverse(name)))
+    return scenarios
+
+
+def _cache_reads():
+    """(succès, échecs) cumulés de tous les caches du processus"""
+    metrics = cache_metrics().values()
+    return sum(counts['hits'] for counts in metrics), sum(counts['misses'] for counts in metrics)
+
+
+def measure_view(client, url, repeat=5, revalidate=False):
+    """
+    Mesure une vue (GET) : une requête de chauffe (caches), puis `repeat`
+    requêtes chronométrées et une dernière sous tracemalloc pour la mémoire.
+    Avec `revalidate`, les requêtes renvoient l'ETag reçu (If-None-Match),
+    comme un navigateur qui a déjà la page.
+    """
+    headers = {}
+    client.get(url)
+    if revalidate:
+        # Deux chauffes : la première visite peut marquer la conversation comme lue
+        headers['If-None-Match'] = client.get(url).get('ETag', '')
+    timings = []
+    query_counts = []
+    hits_before, misses_before = _cache_reads()
+    for _ in range(repeat):
+        # Le journal des requêtes est vidé au début de chaque requête HTTP :
+        # le vider avant pour que la capture parte de zéro
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url, headers=headers)
+            timings.append((time.perf_counter() - start) * 1000)
+        # Compter tout de suite : la requête suivante vide le journal des requêtes
+        query_counts.append(len(queries))
+    hits, misses = _cache_reads()
+
+    tracemalloc.start()
+    try:
+        client.get(url, headers=headers)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'url': url,
+        'status': response.status_code,
+        # Requêtes SQL par requête HTTP (les chronométrées)
+        'queries': {'min': min(query_counts), 'max': max(query_counts)},
+        # Lectures du cache par requête (moyenne des requêtes chronométrées)
+        'cache': {
+            'hits': round((hits - hits_before) / repeat, 1),
+            'misses': round((misses - misses_before) / repeat, 1),
+        },
+        'time_ms': {
+            'min': round(min(timings), 2),
+            'median': round(statistics.median(timings), 2),
+            'max': round(max(timings), 2),
+        },
+        'peak_memory_kib': round(peak / 1024, 1),
+    }
+
+
+def run_benchmark(school, repeat=5):
+    """{nom de la vue: mesures} pour tous les scénarios"""
+    results = {}
+    clients = {}
+    for name, user, url in benchmark_scenarios(school):
+        if user.pk not in clients:
+            clients[user.pk] = Client()
+            clients[user.pk].force_login(user)
+        results[name] = measure_view(clients[user.pk], url, repeat, revalidate=name.endswith('(revalidation)'))
+    return results
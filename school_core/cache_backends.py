@@ -0,0 +1,273 @@
+# school_core/cache_backends.py
+# Backends de cache de l'application, avec compteurs de succès / échecs
+#
+# - LocMemCache : LRU en mémoire, propre à chaque processus (développement, tests)
+# - FileBasedCache : fichiers dans un répertoire, partagés par les processus d'une machine
+# - SQLiteCache : base SQLite (mode WAL) partagée par les workers d'une machine,
+#   avec add() et incr() atomiques
+#
+# Le backend est choisi par variables d'environnement (voir config/cache.py).
+# Les compteurs sont tenus par processus : cache_metrics() les renvoie,
+# l'API d'administration et la commande `benchmark` les affichent.
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.core.cache.backends import filebased, locmem
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+_metrics = defaultdict(Counter)
+_metrics_lock = threading.Lock()
+_batch = threading.local()
+
+
+def _record(name, **counts):
+    with _metrics_lock:
+        _metrics[name].update(counts)
+
+
+def cache_metrics():
+    """{nom du cache: {hits, misses, sets, deletes, hit_rate}} pour ce processus"""
+    with _metrics_lock:
+        snapshot = {name: dict(counts) for name, counts in _metrics.items()}
+    for counts in snapshot.values():
+        for field in ('hits', 'misses', 'sets', 'deletes'):
+            counts.setdefault(field, 0)
+        reads = counts['hits'] + counts['misses']
+        counts['hit_rate'] = round(counts['hits'] / reads, 3) if reads else None
+    return snapshot
+
+
+def reset_cache_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+class CacheMetricsMixin:
+    """
+    Compte les lectures réussies ou non, écritures et suppressions d'un backend.
+    Le nom des compteurs est l'option METRICS_NAME (l'alias du cache), sinon LOCATION.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.metrics_name = params.get('OPTIONS', {}).get('METRICS_NAME') or location or type(self).__name__
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if not getattr(_batch, 'active', False):
+            _record(self.metrics_name, **{'hits' if value is not _MISSING else 'misses': 1})
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        # Les backends qui lisent clé par clé passent par get() : ne pas compter deux fois
+        _batch.active = True
+        try:
+            found = super().get_many(keys, version)
+        finally:
+            _batch.active = False
+        _record(self.metrics_name, hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        _record(self.metrics_name, sets=1)
+        return super().set(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        _record(self.metrics_name, sets=1)
+        return super().add(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        _record(self.metrics_name, sets=len(data))
+        return super().set_many(data, timeout, version)
+
+    def delete(self, key, version=None):
+        _record(self.metrics_name, deletes=1)
+        return super().delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        _record(self.metrics_name, deletes=len(keys))
+        return super().delete_many(keys, version)
+
+
+class BaseSQLiteCache(BaseCache):
+    """
+    Cache dans un fichier SQLite : une table (clé, valeur picklée, expiration).
+    Chaque thread de chaque processus a sa connexion ; le mode WAL permet aux
+    lectures de ne pas attendre les écritures des autres workers.
+    """
+
+    # Nombre d'écritures entre deux nettoyages (entrées expirées, puis MAX_ENTRIES)
+    CULL_EVERY = 100
+    BUSY_TIMEOUT = 5
+    CHUNK_SIZE = 500
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        # Nouvelle connexion après un fork (workers gunicorn) : elles ne se partagent pas
+        if getattr(self._local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=self.BUSY_TIMEOUT, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries '
+                '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL) WITHOUT ROWID'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def _execute(self, sql, params=()):
+        return self._connection().execute(sql, params)
+
+    def _dumps(self, value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _written(self, count=1):
+        self._writes += count
+        if self._writes >= self.CULL_EVERY:
+            self._writes = 0
+            self._cull()
+
+    def _cull(self):
+        self._execute('DELETE FROM cache_entries WHERE expires <= ?', (time.time(),))
+        count = self._execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        if count > self._max_entries:
+            # Les entrées qui expirent le plus tôt d'abord, les permanentes en dernier
+            self._execute(
+                'DELETE FROM cache_entries WHERE key IN ('
+                'SELECT key FROM cache_entries ORDER BY expires IS NULL, expires LIMIT ?)',
+                (max(count // self._cull_frequency, count - self._max_entries),)
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version)
+        row = self._execute(
+            'SELECT value FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time())
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version): key for key in keys}
+        found = {}
+        made = list(keys)
+        for start in range(0, len(made), self.CHUNK_SIZE):
+            chunk = made[start:start + self.CHUNK_SIZE]
+            rows = self._execute(
+                f'SELECT key, value FROM cache_entries WHERE key IN ({",".join("?" * len(chunk))}) '
+                'AND (expires IS NULL OR expires > ?)',
+                (*chunk, time.time())
+            )
+            for key, value in rows:
+                found[keys[key]] = pickle.loads(value)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        self._execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)',
+            (key, self._dumps(value), self.get_backend_timeout(timeout))
+        )
+        self._written()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [(self.make_and_validate_key(key, version), self._dumps(value), expires) for key, value in data.items()]
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany('INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)', rows)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        self._written(len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Atomique : une seule des écritures concurrentes d'une clé absente réussit"""
+        key = self.make_and_validate_key(key, version)
+        cursor = self._execute(
+            'INSERT INTO cache_entries (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache_entries.expires <= ?',
+            (key, self._dumps(value), self.get_backend_timeout(timeout), time.time())
+        )
+        self._written()
+        return cursor.rowcount > 0
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        cursor = self._execute(
+            'UPDATE cache_entries SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time())
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        """Atomique (transaction IMMEDIATE), contrairement à l'implémentation par défaut"""
+        made_key = self.make_and_validate_key(key, version)
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT value FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (made_key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute('UPDATE cache_entries SET value = ? WHERE key = ?', (self._dumps(value), made_key))
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return value
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        return self._execute(
+            'SELECT 1 FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        return self._execute('DELETE FROM cache_entries WHERE key = ?', (key,)).rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        self._connection().executemany(
+            'DELETE FROM cache_entries WHERE key = ?',
+            [(self.make_and_validate_key(key, version),) for key in keys]
+        )
+
+    def clear(self):
+        self._execute('DELETE FROM cache_entries')
+
+
+class LocMemCache(CacheMetricsMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(CacheMetricsMixin, filebased.FileBasedCache):
+    pass
+
+
+class SQLiteCache(CacheMetricsMixin, BaseSQLiteCache):
+    pass
@@ -0,0 +1,112 @@
+# school_core/conditional.py
+# Réponses conditionnelles (ETag / Last-Modified) des pages et API de conversations
+#
+# Le validateur d'une page est dérivé, en une ou deux requêtes agrégées, des
+# conversations qu'elle affiche (nombre, dernier message, Conversation.updated_at),
+# des états de lecture de l'utilisateur, de l'empreinte de son périmètre
+# (school_core/access.py) et de la version des noms et rôles affichés
+# (school_core/fragments.py).
+# Si le navigateur a déjà la bonne version, la réponse est un 304 : ni les
+# requêtes de la vue ni le rendu du gabarit ne sont exécutés.
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages as django_messages
+from django.db.models import Count, Max, Sum
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .fragments import people_version
+from .models import Conversation, ConversationReadState, SchoolLevel
+from .visibility import visible_conversations
+
+# À changer lors d'un déploiement qui modifie les gabarits : invalide les copies des navigateurs
+ETAG_SALT = getattr(settings, 'SCHOOL_ETAG_SALT', '')
+
+
+def conversation_validators(request, conversations, read_states=True):
+    """
+    (etag, last_modified) de ce que voit l'utilisateur de la requête dans
+    `conversations` (queryset). `read_states` : la page affiche aussi les
+    pastilles "non lus".
+    """
+    summary = conversations.order_by().aggregate(
+        count=Count('id'), last_id=Max('id'), updated=Max('updated_at'), last_message=Max('last_message_at')
+    )
+    parts = [summary['count'], summary['last_id'], summary['updated'], summary['last_message']]
+    dates = [summary['updated'], summary['last_message']]
+    if read_states:
+        reads = ConversationReadState.objects.filter(user_id=request.user.id).aggregate(
+            read=Max('last_read_at'), unread=Sum('unread_count')
+        )
+        parts += [reads['read'], reads['unread']]
+        dates.append(reads['read'])
+
+    # Une nouvelle session (connexion) renouvelle aussi le jeton CSRF inclus dans la page
+    # people_version : noms et rôles affichés (panneau des participants)
+    parts += [
+        ETAG_SALT, request.user.pk, request.access.version, people_version(),
+        request.session.session_key, request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+    ]
+    etag = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    dates = [date for date in dates if date is not None]
+    return etag, max(dates) if dates else None
+
+
+def conditional_on_conversations(get_conversations, read_states=True):
+    """
+    Décorateur de vue : répond 304 si les conversations affichées n'ont pas
+    changé depuis la copie du navigateur (If-None-Match / If-Modified-Since).
+
+    `get_conversations(request, *args, **kwargs)` retourne le queryset des
+    conversations dont dépend la réponse, ou None pour répondre normalement
+    (accès refusé, page non conditionnelle). À placer sous @login_required.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            # Seules les lectures sont conditionnelles ; un message flash en
+            # attente doit être affiché par un vrai rendu
+            if request.method not in ('GET', 'HEAD') or len(django_messages.get_messages(request)):
+                return view(request, *args, **kwargs)
+            conversations = get_conversations(request, *args, **kwargs)
+            if conversations is None:
+                return view(request, *args, **kwargs)
+
+            etag, last_modified = conversation_validators(request, conversations, read_states)
+            response = condition(
+                etag_func=lambda *args, **kwargs: etag,
+                last_modified_func=lambda *args, **kwargs: last_modified,
+            )(view)(request, *args, **kwargs)
+            # Le navigateur garde sa copie mais la revalide à chaque affichage
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def level_conversations(slug):
+    """get_conversations des tableaux de bord : conversations visibles du niveau, None sans accès"""
+    def get_conversations(request, *args, **kwargs):
+        level = SchoolLevel.objects.filter(slug=slug).first()
+        if level is None or not request.access.can_access_level(level):
+            return None
+        conversations = visible_conversations(request.user, level)
+        # Conversation ouverte par ?conv= : affichée même si elle est d'un autre
+        # niveau, elle fait partie du validateur ; invisible, la vue répond 404
+        conversation_id = request.GET.get('conv')
+        if conversation_id:
+            if not conversation_id.isdigit() or not request.access.can_view_conversation(conversation_id):
+                return None
+            conversations = conversations | Conversation.objects.filter(id=conversation_id)
+        return conversations
+    return get_conversations
+
+
+def requested_conversation(request, conversation_id, *args, **kwargs):
+    """get_conversations des API d'une conversation : elle seule, None si elle n'est pas visible"""
+    if not request.access.can_view_conversation(conversation_id):
+        return None
+    return Conversation.objects.filter(id=conversation_id)
@@ -0,0 +1,6 @@
+# school_core/context_processors.py
+
+
+def access(request):
+    """Périmètre de l'utilisateur dans les gabarits : {{ access.can_create_conversation }}, ..."""
+    return {'access': getattr(request, 'access', None)}
@@ -0,0 +1,31 @@
+# school_core/fastjson.py
+# Sérialisation JSON des API volumineuses
+#
+# orjson (dépendance optionnelle : `pip install orjson`) est nettement plus
+# rapide que le module json ; sans lui, on se rabat sur json et
+# DjangoJSONEncoder, avec une sortie équivalente.
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data):
+    """Données -> JSON compact (bytes, UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class FastJsonResponse(HttpResponse):
+    """JsonResponse sérialisée avec dumps() (dictionnaires et listes)"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
@@ -0,0 +1,112 @@
+# school_core/feed.py
+# Pagination par curseur (created_at, id) du fil de publications d'une conversation
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import dateformat, timezone
+
+from .images import variant_url
+from .models import Post
+
+# Nombre de publications chargées au premier affichage et par page de défilement
+FEED_PAGE_SIZE = 20
+MAX_FEED_PAGE_SIZE = 100
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(post):
+    """Encode la position (created_at, id) d'une publication en curseur opaque"""
+    delta = post.created_at - _EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{micros}-{post.id}"
+
+
+# Plus grand identifiant représentable (entier signé 64 bits des bases)
+_MAX_ID = 2 ** 63 - 1
+
+
+def decode_cursor(value):
+    """Décode un curseur en tuple (created_at, id). Lève ValueError si invalide."""
+    micros, _, post_id = value.partition('-')
+    try:
+        created_at = _EPOCH + timedelta(microseconds=int(micros))
+    except OverflowError:
+        # Date hors de l'intervalle de datetime : saisie invalide, pas une erreur serveur
+        raise ValueError(f'Curseur invalide : {value!r}')
+    post_id = int(post_id)
+    if not 0 <= post_id <= _MAX_ID:
+        raise ValueError(f'Curseur invalide : {value!r}')
+    return created_at, post_id
+
+
+def get_feed_page(conversation, before=None, after=None, limit=FEED_PAGE_SIZE):
+    """
+    Retourne une page du fil d'une conversation, triée chronologiquement.
+
+    - sans curseur : les `limit` publications les plus récentes
+    - before : les publications plus anciennes que ce curseur
+    - after : les publications plus récentes que ce curseur
+
+    La requête suit l'index (conversation, is_published, created_at, id) :
+    aucun OFFSET, le coût ne dépend pas de la profondeur dans l'historique.
+    """
+    limit = max(1, min(limit, MAX_FEED_PAGE_SIZE))
+    posts = Post.objects.filter(
+        conversation=conversation,
+        is_published=True
+    ).select_related('author')
+
+    if after:
+        created_at, post_id = decode_cursor(after)
+        posts = posts.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=post_id)
+        ).order_by('created_at', 'id')
+        rows = list(posts[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'posts': rows,
+            'older_cursor': None,
+            'newer_cursor': encode_cursor(rows[-1]) if rows else after,
+            'has_more': has_more,
+        }
+
+    if before:
+        created_at, post_id = decode_cursor(before)
+        posts = posts.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=post_id)
+        )
+    rows = list(posts.order_by('-created_at', '-id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return {
+        'posts': rows,
+        'older_cursor': encode_cursor(rows[0]) if rows and has_more else None,
+        'newer_cursor': encode_cursor(rows[-1]) if rows else None,
+        'has_more': has_more,
+    }
+
+
+def serialize_post(post):
+    """Représentation JSON d'une publication pour le messenger"""
+    author = post.author
+    return {
+        'id': post.id,
+        'cursor': encode_cursor(post),
+        'author': {
+            'id': author.id,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+            'is_teacher': author.is_teacher,
+        },
+        'title': post.title,
+        'description': post.description,
+        'image': variant_url(post.image, 'feed') or None,
+        'image_full': variant_url(post.image, 'full') or None,
+        'status': post.status,
+        'created_at': post.created_at.isoformat(),
+        'created_at_display': dateformat.format(timezone.localtime(post.created_at), 'd/m H:i'),
+    }
@@ -0,0 +1,52 @@
+# school_core/fragments.py
+# Fragments du messenger mis en cache ({% cache %}) : liste des conversations
+# et panneau des participants
+#
+# Les clés sont des versions : Conversation.updated_at (avancé à chaque
+# publication et changement de participants), les pastilles "non lus" de
+# l'utilisateur, et un compteur global renouvelé quand un utilisateur change
+# de nom ou de rôle. Une clé obsolète n'est jamais relue : rien à supprimer,
+# les anciennes entrées expirent d'elles-mêmes. Le cache utilisé est l'alias
+# `template_fragments` s'il est configuré, sinon `default`.
+
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+FRAGMENT_TIMEOUT = getattr(settings, 'SCHOOL_FRAGMENT_TIMEOUT', 3600)
+PEOPLE_VERSION_KEY = 'fragments:people_version'
+
+
+def people_version():
+    """Version des noms et rôles affichés (renouvelée par invalidate_people_fragments)"""
+    version = cache.get(PEOPLE_VERSION_KEY)
+    if version is None:
+        cache.add(PEOPLE_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(PEOPLE_VERSION_KEY)
+    return version
+
+
+def invalidate_people_fragments():
+    cache.delete(PEOPLE_VERSION_KEY)
+
+
+def _timestamp(value):
+    return value.timestamp() if value else ''
+
+
+def messenger_fragments(conversations, selected_conversation=None):
+    """
+    Paramètres des fragments du messenger : {'timeout', 'sidebar', 'participants'}.
+    `conversations` : la liste affichée, annotée par with_unread_counts().
+    """
+    selected_id = selected_conversation.id if selected_conversation else ''
+    sidebar = hashlib.md5(repr([selected_id] + [
+        (conversation.id, _timestamp(conversation.updated_at), conversation.unread_count)
+        for conversation in conversations
+    ]).encode()).hexdigest()
+    participants = ''
+    if selected_conversation:
+        participants = f'{selected_id}:{_timestamp(selected_conversation.updated_at)}:{people_version()}'
+    return {'timeout': FRAGMENT_TIMEOUT, 'sidebar': sidebar, 'participants': participants}
@@ -0,0 +1,101 @@
+# school_core/gallery.py
+# Galerie photos de l'espace parent, paginée par mois puis par curseur
+
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils import dateformat, timezone
+
+from .feed import decode_cursor, encode_cursor, serialize_post
+from .models import Conversation, Post
+
+# Nombre de photos chargées au premier affichage et à chaque défilement
+GALLERY_PAGE_SIZE = 24
+MAX_GALLERY_PAGE_SIZE = 60
+
+
+def gallery_posts(user, child=None):
+    """
+    Publications avec photo visibles par un parent, éventuellement limitées
+    à un enfant : conversations de sa classe et conversations privées de son niveau.
+
+    Les conversations sont filtrées par sous-requête sur la table de liaison,
+    sans jointure sur les participants (pas de doublons ni de DISTINCT).
+    """
+    memberships = Conversation.participants.through.objects.filter(customuser_id=user.id)
+    posts = Post.objects.filter(
+        conversation_id__in=memberships.values('conversation_id'),
+        is_published=True
+    ).exclude(image='').exclude(image__isnull=True)
+
+    if child is not None:
+        if child.classroom_id is None:
+            return posts.none()
+        private_of_level = Conversation.levels.through.objects.filter(
+            schoollevel_id=child.classroom.level_id,
+            conversation__classroom__isnull=True
+        )
+        posts = posts.filter(
+            Q(conversation__classroom_id=child.classroom_id)
+            | Q(conversation_id__in=private_of_level.values('conversation_id'))
+        )
+    return posts
+
+
+def gallery_months(posts):
+    """Mois (datetime du 1er jour) contenant au moins une photo, du plus récent au plus ancien"""
+    return list(posts.datetimes('created_at', 'month', order='DESC'))
+
+
+def month_key(month):
+    return month.strftime('%Y-%m')
+
+
+def parse_month(value):
+    """'2026-03' -> datetime locale du 1er mars 2026. Lève ValueError si invalide."""
+    return timezone.make_aware(datetime.strptime(value, '%Y-%m'))
+
+
+def _next_month(month):
+    if month.month == 12:
+        return month.replace(year=month.year + 1, month=1)
+    return month.replace(month=month.month + 1)
+
+
+def get_gallery_page(posts, month, before=None, limit=GALLERY_PAGE_SIZE):
+    """
+    Retourne une page des photos d'un mois, de la plus récente à la plus ancienne.
+
+    `before` est le curseur renvoyé par la page précédente (voir feed.encode_cursor).
+    """
+    limit = max(1, min(limit, MAX_GALLERY_PAGE_SIZE))
+    posts = posts.filter(
+        created_at__gte=month,
+        created_at__lt=_next_month(month)
+    ).select_related('author', 'conversation')
+
+    if before:
+        created_at, post_id = decode_cursor(before)
+        posts = posts.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=post_id)
+        )
+    rows = list(posts.order_by('-created_at', '-id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'posts': rows,
+        'cursor': encode_cursor(rows[-1]) if rows and has_more else None,
+        'has_more': has_more,
+    }
+
+
+def serialize_gallery_post(post):
+    """Représentation JSON d'une photo de la galerie (publication + conversation)"""
+    data = serialize_post(post)
+    data['created_at_display'] = dateformat.format(timezone.localtime(post.created_at), 'd/m/Y à H:i')
+    data['conversation'] = {
+        'id': post.conversation_id,
+        'name': post.conversation.name,
+        'conversation_type': post.conversation.conversation_type,
+    }
+    return data
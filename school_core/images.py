@@ -0,0 +1,118 @@
+# school_core/images.py
+# Déclinaisons des photos envoyées (miniature, fil, plein écran)
+#
+# Les photos de téléphone font plusieurs mégaoctets et contiennent des
+# métadonnées EXIF (dont la position GPS). Chaque photo est déclinée en
+# tailles fixes au format WebP, sans EXIF ; les gabarits choisissent la taille
+# adaptée avec le filtre {{ post.image|variant:"feed" }}. L'original n'est
+# jamais servi : tant que les déclinaisons n'existent pas (tâche en attente,
+# fichier illisible), une image neutre le remplace.
+
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Nom -> côté maximal en pixels
+IMAGE_VARIANTS = {
+    'thumb': 160,
+    'feed': 720,
+    'full': 1600,
+}
+VARIANT_FORMAT = 'WEBP'
+VARIANT_EXTENSION = 'webp'
+VARIANT_QUALITY = 80
+# Rectangle gris (SVG encodé, sans guillemet simple : utilisable dans un attribut onclick)
+PLACEHOLDER_URL = (
+    'data:image/svg+xml,%3Csvg xmlns=%22http://www.w3.org/2000/svg%22 viewBox=%220 0 4 3%22%3E'
+    '%3Crect width=%224%22 height=%223%22 fill=%22%23e5e7eb%22/%3E%3C/svg%3E'
+)
+
+
+def variants_attname(field_file):
+    """Nom du champ JSON qui stocke les déclinaisons (ex. image -> image_variants)"""
+    return f'{field_file.field.name}_variants'
+
+
+def variant_path(name, variant):
+    """posts/2026/01/photo.jpg -> posts/2026/01/variants/photo_feed.webp"""
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'variants', f'{stem}_{variant}.{VARIANT_EXTENSION}')
+
+
+def generate_variants(field_file):
+    """
+    Génère les déclinaisons d'une image et retourne le dictionnaire à stocker
+    dans le champ `<champ>_variants` : {'source': nom, 'thumb': chemin, ...}.
+
+    Si le fichier n'est pas une image lisible, retourne {'source': nom} sans
+    déclinaison : le fichier est marqué comme traité et n'est pas redécliné.
+    """
+    storage = field_file.storage
+    try:
+        with storage.open(field_file.name, 'rb') as source:
+            image = Image.open(source)
+            # Appliquer l'orientation EXIF avant de supprimer les métadonnées
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning("Impossible de décliner l'image %s", field_file.name, exc_info=True)
+        return {'source': field_file.name}
+
+    variants = {'source': field_file.name}
+    for variant, max_size in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        # Pas de paramètre exif : le fichier produit ne contient aucune métadonnée
+        resized.save(buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4)
+        path = variant_path(field_file.name, variant)
+        if storage.exists(path):
+            storage.delete(path)
+        variants[variant] = storage.save(path, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def variants_are_current(field_file):
+    """Vrai si les déclinaisons stockées correspondent au fichier actuel"""
+    variants = getattr(field_file.instance, variants_attname(field_file)) or {}
+    return variants.get('source') == (field_file.name or None)
+
+
+def has_variants(field_file):
+    """Vrai si les déclinaisons du fichier actuel existent (faux s'il était illisible)"""
+    variants = getattr(field_file.instance, variants_attname(field_file)) or {}
+    return variants_are_current(field_file) and all(variant in variants for variant in IMAGE_VARIANTS)
+
+
+def refresh_variants(instance, field_name):
+    """
+    (Re)génère les déclinaisons d'un champ image si le fichier a changé et
+    les enregistre sans déclencher de nouveau save().
+    """
+    field_file = getattr(instance, field_name)
+    if variants_are_current(field_file):
+        return False
+    variants = generate_variants(field_file) if field_file else {}
+    attname = variants_attname(field_file)
+    setattr(instance, attname, variants)
+    type(instance).objects.filter(pk=instance.pk).update(**{attname: variants})
+    return True
+
+
+def variant_url(field_file, variant):
+    """
+    URL de la déclinaison demandée, ou de l'image neutre si elle n'existe pas
+    (encore) : l'original, avec ses métadonnées EXIF, n'est jamais servi.
+    """
+    if not field_file:
+        return ''
+    variants = getattr(field_file.instance, variants_attname(field_file), None) or {}
+    if variants.get('source') == field_file.name and variant in variants:
+        return field_file.storage.url(variants[variant])
+    return PLACEHOLDER_URL
@@ -0,0 +1,92 @@
+# school_core/management/commands/benchmark.py
+import json
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from school_core.benchmark import run_benchmark
+from school_core.synthetic import build_school
+
+
+# Cache propre à la mesure : le cache réel (fichiers, SQLite partagés avec les
+# workers) n'est ni lu ni vidé ni rempli avec les données de l'école fictive
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'school_core.cache_backends.LocMemCache',
+        'LOCATION': 'benchmark',
+        'OPTIONS': {'METRICS_NAME': 'benchmark'},
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Mesure les vues principales (requêtes SQL, temps, mémoire) sur une école fictive '
+        'générée dans une base temporaire, et écrit un rapport JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=750, help='Nombre d\'élèves (défaut : 750)')
+        parser.add_argument('--students-per-classroom', type=int, default=25, help='Élèves par classe (défaut : 25)')
+        parser.add_argument('--posts-per-classroom', type=int, default=200, help='Publications par groupe de classe (défaut : 200)')
+        parser.add_argument('--seed', type=int, default=0, help='Graine du générateur (données reproductibles)')
+        parser.add_argument('--repeat', type=int, default=5, help='Requêtes chronométrées par vue (défaut : 5)')
+        parser.add_argument('--output', default='benchmark-report.json', help='Fichier du rapport JSON')
+
+    def handle(self, *args, **options):
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            self._run(options)
+
+    def _run(self, options):
+        # Base temporaire (comme les tests) : la base de développement n'est pas touchée
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write('🏫 Génération de l\'école fictive...')
+            start = time.perf_counter()
+            school = build_school(
+                students=options['students'],
+                students_per_classroom=options['students_per_classroom'],
+                posts_per_classroom=options['posts_per_classroom'],
+                seed=options['seed'],
+            )
+            seed_seconds = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(f'✅ Données générées en {seed_seconds:.1f} s : {school["counts"]}'))
+
+            self.stdout.write('⏱️  Mesure des vues...')
+            views = run_benchmark(school, repeat=options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'parameters': {
+                name: options[name]
+                for name in ['students', 'students_per_classroom', 'posts_per_classroom', 'seed', 'repeat']
+            },
+            'dataset': school['counts'],
+            'seed_seconds': round(seed_seconds, 2),
+            'views': views,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2, sort_keys=True, ensure_ascii=False)
+            report_file.write('\n')
+
+        self.stdout.write(f'\n{"Vue":<36}{"Statut":>7}{"Requêtes/req.":>15}{"Cache (succès)":>16}{"Médiane (ms)":>14}{"Mémoire (Kio)":>15}')
+        for name, result in views.items():
+            reads = result['cache']['hits'] + result['cache']['misses']
+            cache_column = f'{result["cache"]["hits"]:g}/{reads:g}'
+            queries = result['queries']
+            queries_column = str(queries['min']) if queries['min'] == queries['max'] else f'{queries["min"]}-{queries["max"]}'
+            self.stdout.write(
+                f'{name:<36}{result["status"]:>7}{queries_column:>15}{cache_column:>16}'
+                f'{result["time_ms"]["median"]:>14}{result["peak_memory_kib"]:>15}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'\n📄 Rapport écrit dans {options["output"]}'))
@@ -1,61 +1,51 @@
 # school_core/management/commands/create_group_conversations.py
 from django.core.management.base import BaseCommand
-from school_core.models import Classroom, Conversation, Post
-from django.utils import timezone
+from school_core.membership import sync_group_conversations
+from school_core.models import Conversation
 
 
 class Command(BaseCommand):
-    help = 'Crée automatiquement des conversations de groupe pour chaque classe'
+    help = (
+        'Crée et synchronise les conversations de groupe de chaque classe '
+        '(enseignant + parents des élèves), en n\'appliquant que les différences'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'classroom_ids',
+            nargs='*',
+            type=int,
+            help='Identifiants des classes à synchroniser (toutes par défaut)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Afficher les changements sans les enregistrer'
+        )
+        parser.add_argument(
+            '--keep-extra',
+            action='store_true',
+            help='Ne retirer personne (garder les participants sans lien avec la classe)'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        self.stdout.write(self.style.SUCCESS(
+            '🔍 Simulation de la synchronisation...' if dry_run else '🚀 Synchronisation des conversations de groupe...'
+        ))
+
+        report = sync_group_conversations(
+            options['classroom_ids'] or None,
+            dry_run=dry_run,
+            remove=not options['keep_extra']
+        )
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write(self.style.SUCCESS('🚀 Création des conversations de groupe...'))
-        
-        classrooms = Classroom.objects.all()
-        created_count = 0
-        
-        for classroom in classrooms:
-            # Vérifier si une conversation de groupe existe déjà
-            existing = Conversation.objects.filter(
-                conversation_type='group',
-                classroom=classroom
-            ).first()
-            
-            if not existing:
-                # Créer la conversation de groupe
-                conversation = Conversation.objects.create(
-                    name=f"Groupe {classroom.name}",
-                    conversation_type='group',
-                    classroom=classroom,
-                    created_by=classroom.teacher if classroom.teacher else None
-                )
-                
-                # Ajouter tous les parents des élèves de la classe
-                for student in classroom.students.all():
-                    for parent in student.parents.all():
-                        conversation.participants.add(parent)
-                
-                # Ajouter l'enseignant
-                if classroom.teacher:
-                    conversation.participants.add(classroom.teacher)
-                
-                # Migrer les anciennes publications vers cette conversation
-                old_posts = Post.objects.filter(classroom=classroom, conversation__isnull=True)
-                migrated = 0
-                for post in old_posts:
-                    post.conversation = conversation
-                    post.save()
-                    migrated += 1
-                
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'✅ Conversation créée pour {classroom.name} ({conversation.participants.count()} participants, {migrated} photos migrées)'
-                    )
-                )
-                created_count += 1
-            else:
-                self.stdout.write(f'⏭️  Conversation déjà existante pour {classroom.name}')
-        
         self.stdout.write('\n' + '='*60)
-        self.stdout.write(self.style.SUCCESS(f'✅ {created_count} nouvelles conversations créées'))
-        self.stdout.write(self.style.SUCCESS(f'📊 Total conversations: {Conversation.objects.count()}'))
+        self.stdout.write(f'🆕 Conversations créées : {report["created"]}')
+        self.stdout.write(f'➕ Participants ajoutés : {report["added"]}')
+        self.stdout.write(f'➖ Participants retirés : {report["removed"]}')
+        self.stdout.write(f'📸 Publications rattachées : {report["migrated_posts"]}')
+        self.stdout.write(f'📊 Total conversations : {Conversation.objects.count()}')
         self.stdout.write('='*60)
+        if dry_run:
+            self.stdout.write(self.style.WARNING('ℹ️ Simulation : aucune modification enregistrée'))
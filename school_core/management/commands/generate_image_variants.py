@@ -0,0 +1,31 @@
+# school_core/management/commands/generate_image_variants.py
+from django.core.management.base import BaseCommand
+from school_core.images import refresh_variants
+from school_core.models import Post, Student
+
+
+class Command(BaseCommand):
+    help = 'Génère les déclinaisons WebP (miniature, fil, plein écran) des photos existantes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Régénérer aussi les déclinaisons déjà à jour'
+        )
+
+    def handle(self, *args, **options):
+        targets = [
+            (Post.objects.exclude(image=''), 'image'),
+            (Student.objects.exclude(photo='').exclude(photo__isnull=True), 'photo'),
+        ]
+        for queryset, field_name in targets:
+            generated = 0
+            for instance in queryset.iterator(chunk_size=200):
+                if options['force']:
+                    setattr(instance, f'{field_name}_variants', {})
+                if refresh_variants(instance, field_name):
+                    generated += 1
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {queryset.model._meta.verbose_name_plural} : {generated} photo(s) déclinée(s)'
+            ))
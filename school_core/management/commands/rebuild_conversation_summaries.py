@@ -0,0 +1,23 @@
+# school_core/management/commands/rebuild_conversation_summaries.py
+from django.core.management.base import BaseCommand
+from school_core.read_states import refresh_unread_counts
+from school_core.summaries import refresh_conversation_levels, refresh_conversation_summaries
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit le résumé dénormalisé des conversations (compteurs, dernière publication, niveaux, non lus)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'conversation_ids',
+            nargs='*',
+            type=int,
+            help='Identifiants des conversations à reconstruire (toutes par défaut)'
+        )
+
+    def handle(self, *args, **options):
+        conversation_ids = options['conversation_ids'] or None
+        updated = refresh_conversation_summaries(conversation_ids)
+        refresh_conversation_levels(conversation_ids)
+        refresh_unread_counts(conversation_ids)
+        self.stdout.write(self.style.SUCCESS(f'✅ {updated} conversation(s) mise(s) à jour'))
@@ -0,0 +1,18 @@
+# school_core/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from school_core.models import Message, Post
+from school_core.search import rebuild_index, search_backend
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index plein texte des publications et des messages (tables FTS5 sous SQLite)"
+
+    def handle(self, *args, **options):
+        if search_backend() != 'fts5':
+            self.stdout.write("ℹ️ Rien à reconstruire : l'index PostgreSQL est maintenu par la base")
+            return
+        for model in (Post, Message):
+            rebuild_index(model)
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {model._meta.verbose_name_plural} : {model.objects.count()} ligne(s) indexée(s)'
+            ))
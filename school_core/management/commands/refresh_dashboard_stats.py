@@ -0,0 +1,13 @@
+# school_core/management/commands/refresh_dashboard_stats.py
+from django.core.management.base import BaseCommand
+from school_core.stats import recompute_dashboard_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs du tableau de bord administrateur (à lancer périodiquement, ex. cron)'
+
+    def handle(self, *args, **options):
+        stats = recompute_dashboard_stats()
+        for name, value in stats.items():
+            self.stdout.write(f'  {name} : {value}')
+        self.stdout.write(self.style.SUCCESS('✅ Compteurs du tableau de bord recalculés'))
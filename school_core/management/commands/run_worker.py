@@ -0,0 +1,47 @@
+# school_core/management/commands/run_worker.py
+import time
+
+from django.core.management.base import BaseCommand
+from school_core.tasks import requeue_stale_tasks, run_pending
+
+
+class Command(BaseCommand):
+    help = 'Exécute les tâches de fond en attente (traitement des photos, ...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Traiter les tâches dues puis s\'arrêter'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Pause en secondes quand la file est vide (défaut : 2)'
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=50,
+            help='Nombre maximum de tâches traitées entre deux vérifications (défaut : 50)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🚀 Worker démarré'))
+        try:
+            while True:
+                requeued = requeue_stale_tasks()
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f'↩️  {requeued} tâche(s) abandonnée(s) remise(s) en file'))
+                
+                processed = run_pending(limit=options['batch'])
+                if processed:
+                    self.stdout.write(f'✅ {processed} tâche(s) traitée(s)')
+                
+                if options['once'] and processed < options['batch']:
+                    break
+                if not processed:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('\n⏹️  Worker arrêté')
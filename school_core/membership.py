@@ -0,0 +1,250 @@
+# school_core/membership.py
+# Gestion groupée des participants des conversations
+#
+# Les groupes de classe ont une composition définie par la classe :
+# l'enseignant et les parents des élèves. sync_group_conversations() la
+# calcule en quelques requêtes ensemblistes et n'applique que la différence.
+# Les signaux (school_core/signals.py) la déclenchent pour les classes
+# touchées par une modification, une fois par transaction, en ne retirant que
+# les participants que cette modification a rendus obsolètes.
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Subquery
+
+from . import stats
+from .access import invalidate_access
+from .models import Classroom, Conversation, Post, Student
+from .read_states import create_read_states, delete_read_state_pairs, refresh_unread_counts
+from .search import rebuild_index, search_backend
+from .summaries import refresh_conversation_levels, refresh_conversation_summaries, refresh_participant_counts
+
+
+def parent_ids_for_students(student_ids):
+    """Identifiants des parents des élèves donnés (une requête sur la table de liaison)"""
+    return set(
+        Student.parents.through.objects.filter(
+            student_id__in=student_ids
+        ).values_list('customuser_id', flat=True)
+    )
+
+
+def add_student_parents(conversation, student_ids):
+    """
+    Ajoute les parents des élèves sélectionnés à une conversation.
+
+    Le nombre de requêtes ne dépend pas du nombre d'élèves : les parents sont
+    résolus en une requête et les liens manquants insérés en un seul INSERT
+    groupé (via participants.add, qui déclenche les signaux m2m_changed).
+    Retourne le nombre de participants ajoutés.
+    """
+    parent_ids = parent_ids_for_students(student_ids)
+    if not parent_ids:
+        return 0
+    existing = set(
+        Conversation.participants.through.objects.filter(
+            conversation_id=conversation.pk,
+            customuser_id__in=parent_ids
+        ).values_list('customuser_id', flat=True)
+    )
+    missing = parent_ids - existing
+    if missing:
+        conversation.participants.add(*missing)
+    return len(missing)
+
+
+def students_with_membership(students, conversation=None):
+    """
+    Annote des élèves avec `parents_count` et, si une conversation est donnée,
+    `already_in` (au moins un de leurs parents y participe déjà).
+    """
+    students = students.annotate(parents_count=Count('parents'))
+    if conversation is not None:
+        participant_links = Student.parents.through.objects.filter(
+            student_id=OuterRef('pk'),
+            customuser__conversations=conversation
+        )
+        students = students.annotate(already_in=Exists(participant_links))
+    return students
+
+
+def _group_conversations(classroom_ids):
+    conversations = Conversation.objects.filter(conversation_type='group', classroom__isnull=False)
+    if classroom_ids is not None:
+        conversations = conversations.filter(classroom_id__in=classroom_ids)
+    return conversations
+
+
+def desired_group_members(classroom_ids=None):
+    """{classroom_id: {user_id}} : l'enseignant et les parents des élèves de chaque classe (deux requêtes)"""
+    classrooms = Classroom.objects.all()
+    links = Student.parents.through.objects.filter(student__classroom__isnull=False)
+    if classroom_ids is not None:
+        classrooms = classrooms.filter(id__in=classroom_ids)
+        links = links.filter(student__classroom_id__in=classroom_ids)
+    members = {
+        classroom_id: {teacher_id} if teacher_id else set()
+        for classroom_id, teacher_id in classrooms.values_list('id', 'teacher_id')
+    }
+    for classroom_id, parent_id in links.values_list('student__classroom_id', 'customuser_id').distinct():
+        members[classroom_id].add(parent_id)
+    return members
+
+
+def migrate_legacy_posts(classroom_ids=None):
+    """
+    Rattache les anciennes publications (Post.classroom sans conversation) au
+    groupe de leur classe, en un seul UPDATE.
+    Retourne (nombre de publications, conversations touchées).
+    """
+    legacy = Post.objects.filter(conversation__isnull=True, classroom__isnull=False)
+    if classroom_ids is not None:
+        legacy = legacy.filter(classroom_id__in=classroom_ids)
+    group = _group_conversations(None).filter(classroom_id=OuterRef('classroom_id')).order_by('id')
+    legacy = legacy.filter(Exists(group))
+    # Les groupes qui vont recevoir des publications, calculés par la base
+    touched = set(
+        legacy.annotate(target=Subquery(group.values('id')[:1])).values_list('target', flat=True).distinct()
+    )
+    if not touched:
+        return 0, set()
+    migrated_count = legacy.update(conversation=Subquery(group.values('id')[:1]))
+    if search_backend() == 'fts5':
+        # L'index plein texte conserve la conversation de chaque publication :
+        # publications de classe de ces groupes (celles déjà rattachées sont recopiées à l'identique)
+        rebuild_index(Post, Post.objects.filter(conversation_id__in=touched, classroom__isnull=False))
+    return migrated_count, touched
+
+
+def sync_group_conversations(classroom_ids=None, dry_run=False, remove=True, removable=None):
+    """
+    Met les groupes de classe en conformité (toutes les classes, ou `classroom_ids`) :
+    - crée le groupe des classes qui n'en ont pas ;
+    - ajoute les participants manquants et, si `remove`, retire ceux qui
+      n'ont plus de lien avec la classe (les directeurs sont conservés) ;
+      avec `removable` (couples (classe, utilisateur)), seuls ces participants
+      peuvent être retirés : les personnes ajoutées à la main restent ;
+    - rattache les anciennes publications de la classe au groupe.
+
+    Le nombre de requêtes ne dépend pas du nombre de classes. Les insertions et
+    suppressions groupées ne déclenchent pas m2m_changed : compteurs, niveaux,
+    états de lecture et périmètres (school_core/access.py) sont mis à jour ici. Avec `dry_run`, tout est annulé.
+
+    Retourne {'created', 'added', 'removed', 'migrated_posts'}.
+    """
+    through = Conversation.participants.through
+    with transaction.atomic():
+        desired = desired_group_members(classroom_ids)
+        groups = defaultdict(list)
+        for conversation_id, classroom_id in _group_conversations(classroom_ids).values_list('id', 'classroom_id'):
+            groups[classroom_id].append(conversation_id)
+
+        missing = Classroom.objects.filter(id__in=desired.keys() - groups.keys())
+        created = Conversation.objects.bulk_create([
+            Conversation(name=f"Groupe {name}", conversation_type='group', classroom_id=classroom_id, created_by_id=teacher_id)
+            for classroom_id, name, teacher_id in missing.values_list('id', 'name', 'teacher_id')
+        ])
+        for conversation in created:
+            groups[conversation.classroom_id].append(conversation.id)
+        if created:
+            stats.invalidate_stats(['total_conversations'])
+
+        wanted = {
+            (conversation_id, user_id)
+            for classroom_id, user_ids in desired.items()
+            for conversation_id in groups[classroom_id]
+            for user_id in user_ids
+        }
+        group_classrooms = {
+            conversation_id: classroom_id for classroom_id, ids in groups.items() for conversation_id in ids
+        }
+        existing = {}
+        for link_id, conversation_id, user_id, is_director in through.objects.filter(
+            conversation_id__in=[conversation_id for ids in groups.values() for conversation_id in ids]
+        ).values_list('id', 'conversation_id', 'customuser_id', 'customuser__is_director'):
+            existing[(conversation_id, user_id)] = (link_id, is_director)
+
+        to_add = wanted - existing.keys()
+        to_remove = {
+            pair: link_id for pair, (link_id, is_director) in existing.items()
+            if remove and pair not in wanted and not is_director
+            and (removable is None or (group_classrooms[pair[0]], pair[1]) in removable)
+        }
+        through.objects.bulk_create(
+            [through(conversation_id=conversation_id, customuser_id=user_id) for conversation_id, user_id in to_add],
+            ignore_conflicts=True
+        )
+        if to_remove:
+            through.objects.filter(id__in=to_remove.values()).delete()
+            delete_read_state_pairs(to_remove.keys())
+
+        changed = {conversation_id for conversation_id, _ in to_add | to_remove.keys()}
+        changed.update(conversation.id for conversation in created)
+        if changed:
+            refresh_participant_counts(changed)
+            refresh_conversation_levels(changed)
+        create_read_states(to_add)
+        invalidate_access(
+            {user_id for _, user_id in to_add | to_remove.keys()}
+            | {conversation.created_by_id for conversation in created}
+        )
+
+        migrated_count, migrated = migrate_legacy_posts(classroom_ids)
+        if migrated:
+            refresh_conversation_summaries(migrated)
+            refresh_unread_counts(migrated)
+
+        report = {
+            'created': len(created),
+            'added': len(to_add),
+            'removed': len(to_remove),
+            'migrated_posts': migrated_count,
+        }
+        if dry_run:
+            transaction.set_rollback(True)
+    return report
+
+
+class _ScheduledSync:
+    """Callback on_commit : les classes à synchroniser à la fin d'une transaction"""
+
+    def __init__(self):
+        self.classroom_ids = set()
+        self.removable = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        sync_group_conversations(self.classroom_ids, removable=self.removable)
+
+
+def schedule_group_sync(classroom_ids, removable=(), using=None):
+    """
+    Synchronise les groupes de ces classes après validation de la transaction.
+    Toutes les classes demandées pendant une même transaction sont traitées
+    ensemble, par une seule synchronisation (annulée avec la transaction).
+
+    Seuls les couples (classe, utilisateur) de `removable`, que la modification
+    a pu rendre obsolètes (anciens parents, ancien enseignant), sont retirés
+    s'ils n'ont plus de lien avec la classe : les participants ajoutés à la
+    main restent.
+    """
+    classroom_ids = {classroom_id for classroom_id in classroom_ids if classroom_id}
+    if not classroom_ids:
+        return
+    removable = {(classroom_id, user_id) for classroom_id, user_id in removable if classroom_id and user_id}
+    connection = transaction.get_connection(using)
+    scheduled = next((
+        callback for _, callback, _ in connection.run_on_commit
+        if isinstance(callback, _ScheduledSync) and not callback.done
+    ), None)
+    if scheduled is not None:
+        scheduled.classroom_ids.update(classroom_ids)
+        scheduled.removable.update(removable)
+        return
+    scheduled = _ScheduledSync()
+    scheduled.classroom_ids.update(classroom_ids)
+    scheduled.removable.update(removable)
+    # Hors transaction, le callback est exécuté immédiatement
+    transaction.on_commit(scheduled, using)
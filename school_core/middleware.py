@@ -0,0 +1,20 @@
+# school_core/middleware.py
+from django.utils.functional import SimpleLazyObject
+
+from .access import AccessContext
+
+
+class AccessContextMiddleware:
+    """
+    Ajoute `request.access` (school_core/access.py) : le périmètre de
+    l'utilisateur, lu au premier besoin puis partagé par la vue et les gabarits.
+    À placer après AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Paresseux : construit après une éventuelle connexion pendant la requête
+        request.access = SimpleLazyObject(lambda: AccessContext(request.user))
+        return self.get_response(request)
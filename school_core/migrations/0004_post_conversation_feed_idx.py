@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school_core', '0003_remove_grades'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['conversation', 'is_published', 'created_at', 'id'], name='post_conversation_feed_idx'),
+        ),
+    ]
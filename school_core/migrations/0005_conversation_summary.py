@@ -0,0 +1,50 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_summaries(apps, schema_editor):
+    Conversation = apps.get_model('school_core', 'Conversation')
+    Post = apps.get_model('school_core', 'Post')
+    for conversation in Conversation.objects.all():
+        posts = Post.objects.filter(conversation=conversation, is_published=True)
+        last_post = posts.order_by('-created_at', '-id').first()
+        conversation.post_count = posts.count()
+        conversation.participant_count = conversation.participants.count()
+        conversation.last_post = last_post
+        if last_post:
+            conversation.last_message_at = last_post.created_at
+            conversation.last_message_preview = (last_post.description or last_post.title or "📷 Photo")[:120]
+        conversation.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school_core', '0004_post_conversation_feed_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, max_length=120, verbose_name='Aperçu du dernier message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_post',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='school_core.post', verbose_name='Dernière publication'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='participant_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Nombre de participants'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Nombre de publications'),
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
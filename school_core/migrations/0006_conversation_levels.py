@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:58
+
+from django.db import migrations, models
+
+
+def populate_levels(apps, schema_editor):
+    Conversation = apps.get_model('school_core', 'Conversation')
+    Student = apps.get_model('school_core', 'Student')
+    for conversation in Conversation.objects.select_related('classroom'):
+        if conversation.classroom_id:
+            level_ids = {conversation.classroom.level_id}
+        else:
+            level_ids = set(
+                Student.objects.filter(
+                    parents__in=conversation.participants.all(),
+                    classroom__isnull=False
+                ).values_list('classroom__level_id', flat=True)
+            )
+        conversation.levels.set(level_ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school_core', '0005_conversation_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='levels',
+            field=models.ManyToManyField(blank=True, related_name='conversations', to='school_core.schoollevel', verbose_name='Niveaux'),
+        ),
+        migrations.RunPython(populate_levels, migrations.RunPython.noop),
+    ]
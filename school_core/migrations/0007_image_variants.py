@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school_core', '0006_conversation_levels'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school_core', '0007_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='status',
+            field=models.CharField(choices=[('processing', 'En cours de traitement'), ('ready', 'Prêt'), ('failed', 'Échec du traitement')], default='ready', max_length=10, verbose_name='Statut'),
+        ),
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nom')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Paramètres')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('done', 'Terminée'), ('failed', 'Échec')], default='pending', max_length=10, verbose_name='Statut')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=5, verbose_name='Tentatives maximum')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Exécuter après')),
+                ('last_error', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Tâche de fond',
+                'verbose_name_plural': 'Tâches de fond',
+                'ordering': ['run_after', 'id'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='task_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_read_states(apps, schema_editor):
+    # Les publications existantes sont considérées comme lues
+    Conversation = apps.get_model('school_core', 'Conversation')
+    ConversationReadState = apps.get_model('school_core', 'ConversationReadState')
+    through = Conversation.participants.through
+    last_posts = dict(Conversation.objects.values_list('id', 'last_post_id'))
+    ConversationReadState.objects.bulk_create([
+        ConversationReadState(
+            conversation_id=conversation_id,
+            user_id=user_id,
+            last_read_post_id=last_posts[conversation_id]
+        )
+        for conversation_id, user_id in through.objects.values_list('conversation_id', 'customuser_id')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school_core', '0008_task_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationReadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_at', models.DateTimeField(blank=True, null=True, verbose_name='Lu le')),
+                ('unread_count', models.PositiveIntegerField(default=0, verbose_name='Non lus')),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to='school_core.conversation', verbose_name='Conversation')),
+                ('last_read_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='school_core.post', verbose_name='Dernière publication lue')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'État de lecture',
+                'verbose_name_plural': 'États de lecture',
+                'constraints': [models.UniqueConstraint(fields=('user', 'conversation'), name='unique_read_state')],
+            },
+        ),
+        migrations.RunPython(populate_read_states, migrations.RunPython.noop),
+    ]
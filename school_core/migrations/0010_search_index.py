@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:03
+
+from django.db import migrations
+
+# Tables FTS5 (SQLite) : rowid = id de la publication / du message
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS school_core_post_fts USING fts5("
+    "title, description, conversation_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO school_core_post_fts (rowid, title, description, conversation_id) "
+    "SELECT id, title, description, conversation_id FROM school_core_post",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS school_core_message_fts USING fts5("
+    "subject, content, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO school_core_message_fts (rowid, subject, content) "
+    "SELECT id, subject, content FROM school_core_message",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS school_core_post_fts",
+    "DROP TABLE IF EXISTS school_core_message_fts",
+]
+
+# Index GIN (PostgreSQL) sur la même expression que SearchVector(..., config='french')
+POSTGRES_FORWARD = [
+    "CREATE INDEX IF NOT EXISTS school_core_post_search_idx ON school_core_post USING gin ("
+    "to_tsvector('french'::regconfig, COALESCE(title, '') || ' ' || COALESCE(description, '')))",
+    "CREATE INDEX IF NOT EXISTS school_core_message_search_idx ON school_core_message USING gin ("
+    "to_tsvector('french'::regconfig, COALESCE(subject, '') || ' ' || COALESCE(content, '')))",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS school_core_post_search_idx",
+    "DROP INDEX IF EXISTS school_core_message_search_idx",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school_core', '0009_conversationreadstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:04
+
+from django.db import migrations, models
+
+from accounts.utils import name_keys
+
+
+def populate_name_keys(apps, schema_editor):
+    Student = apps.get_model('school_core', 'Student')
+    rows = list(Student.objects.only('first_name', 'last_name'))
+    for row in rows:
+        row.first_name_key, row.last_name_key = name_keys(row.first_name, row.last_name)
+    Student.objects.bulk_update(rows, ['first_name_key', 'last_name_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school_core', '0010_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='first_name_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=301),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='last_name_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=301),
+        ),
+        migrations.RunPython(populate_name_keys, migrations.RunPython.noop),
+    ]
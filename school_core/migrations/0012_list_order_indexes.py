@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school_core', '0011_student_name_search_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='classroom',
+            index=models.Index(fields=['level', 'name', 'id'], name='classroom_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['last_name', 'first_name', 'id'], name='student_name_order_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school_core', '0012_list_order_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Modifiée le'),
+        ),
+    ]
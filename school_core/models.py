@@ -2,6 +2,12 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
+from accounts.utils import NAME_KEY_MAX_LENGTH, name_keys
+
+# Aperçu du dernier message affiché dans la liste des conversations
+POST_PREVIEW_LENGTH = 120
+POST_IMAGE_PREVIEW = "📷 Photo"
+
 # 1. Le Niveau Scolaire (Maternelle, Primaire, Collège)
 class SchoolLevel(models.Model):
     name = models.CharField(max_length=50, unique=True)
@@ -35,6 +41,10 @@ class Classroom(models.Model):
         verbose_name = "Classe"
         verbose_name_plural = "Classes"
         ordering = ['level', 'name']
+        indexes = [
+            # Ordre de la liste paginée du panel administrateur
+            models.Index(fields=['level', 'name', 'id'], name='classroom_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.level.name})"
@@ -59,14 +69,57 @@ class Student(models.Model):
         blank=True
     )
     photo = models.ImageField(upload_to='students/%Y/', blank=True, null=True)
+    # Déclinaisons WebP sans EXIF (voir school_core/images.py)
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Clés de recherche sans accents, calculées à l'enregistrement (voir accounts/utils.py)
+    first_name_key = models.CharField(max_length=NAME_KEY_MAX_LENGTH, blank=True, db_index=True, editable=False)
+    last_name_key = models.CharField(max_length=NAME_KEY_MAX_LENGTH, blank=True, db_index=True, editable=False)
     
     class Meta:
         verbose_name = "Élève"
         verbose_name_plural = "Élèves"
         ordering = ['last_name', 'first_name']
+        indexes = [
+            # Ordre de la liste paginée du panel administrateur
+            models.Index(fields=['last_name', 'first_name', 'id'], name='student_name_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_classroom()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        if fields is None or 'classroom' in fields:
+            self._remember_classroom()
+
+    def _remember_classroom(self):
+        # Champ différé (only/defer) : la classe n'est pas non plus enregistrée par save()
+        if 'classroom_id' in self.__dict__:
+            self._saved_classroom_id = self.classroom_id
+
+    @property
+    def previous_classroom_id(self):
+        """
+        Classe enregistrée en base lors du chargement ou du dernier save() :
+        pendant post_save, les signaux la comparent à la nouvelle classe.
+        """
+        return self.__dict__.get('_saved_classroom_id', self.classroom_id)
+
+    def save(self, *args, **kwargs):
+        self.first_name_key, self.last_name_key = name_keys(self.first_name, self.last_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'first_name', 'last_name'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'first_name_key', 'last_name_key'}
+        super().save(*args, **kwargs)
+        # Après les signaux post_save, qui lisent encore l'ancienne classe
+        if update_fields is None or 'classroom' in update_fields:
+            self._remember_classroom()
 
 
 # 4. Conversation (Groupe ou Discussion privée)
@@ -96,6 +149,13 @@ class Conversation(models.Model):
         related_name='conversations',
         verbose_name="Participants"
     )
+    # Niveaux concernés, précalculés (classe du groupe, ou classes des enfants des participants)
+    levels = models.ManyToManyField(
+        SchoolLevel,
+        related_name='conversations',
+        blank=True,
+        verbose_name="Niveaux"
+    )
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -105,6 +165,22 @@ class Conversation(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
     last_message_at = models.DateTimeField(default=timezone.now, verbose_name="Dernier message")
+    # Dernière modification de ce qui est affiché (publications, participants, nom) :
+    # validateur des réponses conditionnelles (voir school_core/conditional.py)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifiée le")
+    
+    # Résumé dénormalisé, maintenu à l'écriture (voir school_core/summaries.py)
+    post_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de publications")
+    participant_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de participants")
+    last_post = models.ForeignKey(
+        'Post',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Dernière publication"
+    )
+    last_message_preview = models.CharField(max_length=POST_PREVIEW_LENGTH, blank=True, verbose_name="Aperçu du dernier message")
     
     class Meta:
         verbose_name = "Conversation"
@@ -117,7 +193,26 @@ class Conversation(models.Model):
         return f"Discussion: {self.name}"
     
     def get_last_message(self):
-        return self.posts.order_by('-created_at').first()
+        return self.last_post
+    
+    def register_post(self, post):
+        """Met à jour le résumé et les compteurs non lus après la création d'une publication (deux requêtes)"""
+        preview = post.get_preview()
+        Conversation.objects.filter(pk=self.pk).update(
+            post_count=models.F('post_count') + 1,
+            last_post=post,
+            last_message_at=post.created_at,
+            last_message_preview=preview,
+            updated_at=timezone.now()
+        )
+        self.post_count += 1
+        self.last_post = post
+        self.last_message_at = post.created_at
+        self.last_message_preview = preview
+        # Une publication de plus à lire pour les autres participants
+        ConversationReadState.objects.filter(conversation_id=self.pk).exclude(
+            user_id=post.author_id
+        ).update(unread_count=models.F('unread_count') + 1)
 
 
 # 5. Publication (Photos/Messages dans une conversation)
@@ -146,19 +241,37 @@ class Post(models.Model):
     )
     title = models.CharField(max_length=200, blank=True, verbose_name="Titre")
     image = models.ImageField(upload_to='posts/%Y/%m/', blank=True, verbose_name="Photo")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True, verbose_name="Description")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de publication")
     is_published = models.BooleanField(default=True, verbose_name="Publié")
+    STATUS_CHOICES = [
+        ('processing', 'En cours de traitement'),
+        ('ready', 'Prêt'),
+        ('failed', 'Échec du traitement'),
+    ]
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ready', verbose_name="Statut")
     
     class Meta:
         verbose_name = "Publication"
         verbose_name_plural = "Publications"
         ordering = ['-created_at']
+        indexes = [
+            # Pagination par curseur du fil d'une conversation (voir school_core/feed.py)
+            models.Index(
+                fields=['conversation', 'is_published', 'created_at', 'id'],
+                name='post_conversation_feed_idx'
+            ),
+        ]
 
     def __str__(self):
         if self.conversation:
             return f"{self.title or 'Publication'} - {self.conversation} ({self.created_at.strftime('%d/%m/%Y')})"
         return f"{self.title or 'Publication'} ({self.created_at.strftime('%d/%m/%Y')})"
+    
+    def get_preview(self):
+        """Court aperçu affiché dans la liste des conversations"""
+        return (self.description or self.title or POST_IMAGE_PREVIEW)[:POST_PREVIEW_LENGTH]
 
 
 # 6. Message (Communication directe)
@@ -187,3 +300,71 @@ class Message(models.Model):
 
     def __str__(self):
         return f"{self.subject} - De {self.sender} à {self.recipient}"
+
+
+# 7. Tâche de fond (file d'attente locale, voir school_core/tasks.py)
+class Task(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('done', 'Terminée'),
+        ('failed', 'Échec'),
+    ]
+    
+    name = models.CharField(max_length=100, verbose_name="Nom")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Paramètres")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Statut")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Tentatives")
+    max_attempts = models.PositiveSmallIntegerField(default=5, verbose_name="Tentatives maximum")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Exécuter après")
+    last_error = models.TextField(blank=True, verbose_name="Dernière erreur")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernière mise à jour")
+    
+    class Meta:
+        verbose_name = "Tâche de fond"
+        verbose_name_plural = "Tâches de fond"
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='task_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.get_status_display()})"
+
+
+# 8. État de lecture d'une conversation par un participant
+class ConversationReadState(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='read_states',
+        verbose_name="Utilisateur"
+    )
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='read_states',
+        verbose_name="Conversation"
+    )
+    last_read_post = models.ForeignKey(
+        Post,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Dernière publication lue"
+    )
+    last_read_at = models.DateTimeField(null=True, blank=True, verbose_name="Lu le")
+    # Compteur dénormalisé, incrémenté à chaque publication (voir school_core/read_states.py)
+    unread_count = models.PositiveIntegerField(default=0, verbose_name="Non lus")
+    
+    class Meta:
+        verbose_name = "État de lecture"
+        verbose_name_plural = "États de lecture"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'conversation'], name='unique_read_state'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.conversation} ({self.unread_count} non lu(s))"
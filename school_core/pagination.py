@@ -0,0 +1,168 @@
+# school_core/pagination.py
+# Pagination par clé (keyset) des listes du panel administrateur
+#
+# Au lieu de OFFSET (qui relit toutes les lignes précédentes), chaque page
+# démarre après la dernière ligne de la précédente :
+#   WHERE (nom, prénom, id) > ('Martin', 'Léa', 42) ORDER BY nom, prénom, id LIMIT 50
+# Le curseur transporté dans l'URL contient ces valeurs.
+#
+# Le total affiché est exact pour les petites listes ; au-delà, il est estimé
+# (statistiques de la base) ou plafonné pour ne pas parcourir toute la table.
+
+import base64
+import json
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = getattr(settings, 'ADMIN_LIST_PAGE_SIZE', 50)
+PAGE_SIZE_CHOICES = (25, 50, 100, 200)
+# Au-delà, le total d'une liste filtrée est affiché comme "10 000+"
+COUNT_CAP = 10_000
+# En dessous, la table est comptée exactement même sans filtre
+ESTIMATE_THRESHOLD = 50_000
+
+
+def get_page_size(request):
+    """Taille de page demandée (?per_page=), limitée aux valeurs proposées"""
+    try:
+        page_size = int(request.GET.get('per_page', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return DEFAULT_PAGE_SIZE
+    return page_size if page_size in PAGE_SIZE_CHOICES else DEFAULT_PAGE_SIZE
+
+
+def _json_default(value):
+    # isoformat() garde les microsecondes (DjangoJSONEncoder les tronque)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_keyset_cursor(values):
+    data = json.dumps(values, default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_keyset_cursor(cursor, model, fields):
+    """Décode un curseur en valeurs typées. Lève ValueError si invalide."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Curseur invalide") from exc
+    if not isinstance(raw, list) or len(raw) != len(fields):
+        raise ValueError("Curseur invalide")
+    try:
+        return [
+            model._meta.get_field(name.lstrip('-')).to_python(value)
+            for name, value in zip(fields, raw)
+        ]
+    except (TypeError, ValidationError) as exc:
+        # Valeur modifiée à la main (ex. texte à la place d'un identifiant)
+        raise ValueError("Curseur invalide") from exc
+
+
+def _after(fields, values, reverse=False):
+    """Condition "(champs) strictement après (valeurs)" dans l'ordre donné"""
+    condition = Q()
+    for index, name in enumerate(fields):
+        descending = name.startswith('-') != reverse
+        column = name.lstrip('-')
+        step = Q(**{f'{column}__{"lt" if descending else "gt"}': values[index]})
+        for previous, value in zip(fields[:index], values[:index]):
+            step &= Q(**{previous.lstrip('-'): value})
+        condition |= step
+    return condition
+
+
+def _reversed(fields):
+    return [name[1:] if name.startswith('-') else f'-{name}' for name in fields]
+
+
+def approximate_count(queryset):
+    """
+    Nombre de lignes, sans parcourir une grande table :
+    - sans filtre : estimation de la base (sqlite_stat1 après ANALYZE,
+      pg_class.reltuples sous PostgreSQL) si elle dépasse ESTIMATE_THRESHOLD
+    - avec filtre : COUNT plafonné à COUNT_CAP
+
+    Retourne (total, est_approximatif).
+    """
+    if not queryset.query.where:
+        estimate = _table_estimate(queryset.model._meta.db_table)
+        if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+            return estimate, True
+    total = queryset.order_by()[:COUNT_CAP + 1].count()
+    return min(total, COUNT_CAP), total > COUNT_CAP
+
+
+def _table_estimate(table):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # sqlite_stat1 n'existe qu'après un premier ANALYZE
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = %s ORDER BY idx IS NOT NULL LIMIT 1", [table]
+            )
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+    return None
+
+
+def paginate_keyset(request, queryset, ordering):
+    """
+    Page de `queryset` selon ?after= / ?before= (curseurs) et ?per_page=.
+
+    `ordering` doit se terminer par une colonne unique (ex. 'id') pour que
+    l'ordre soit total. Retourne un dictionnaire pour le gabarit
+    admin/_pagination.html.
+    """
+    ordering = list(ordering)
+    page_size = get_page_size(request)
+    total, total_is_estimate = approximate_count(queryset)
+    model = queryset.model
+    columns = [name.lstrip('-') for name in ordering]
+
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    page = queryset
+    try:
+        if before:
+            page = page.filter(_after(ordering, decode_keyset_cursor(before, model, ordering), reverse=True))
+            page = page.order_by(*_reversed(ordering))
+        else:
+            if after:
+                page = page.filter(_after(ordering, decode_keyset_cursor(after, model, ordering)))
+            page = page.order_by(*ordering)
+    except ValueError:
+        after = before = None
+        page = queryset.order_by(*ordering)
+
+    items = list(page[:page_size + 1])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if before:
+        items.reverse()
+
+    def cursor_of(item):
+        return encode_keyset_cursor([getattr(item, column) for column in columns])
+
+    return {
+        'items': items,
+        'page_size': page_size,
+        'page_size_choices': PAGE_SIZE_CHOICES,
+        'total': total,
+        'total_is_estimate': total_is_estimate,
+        'next_cursor': cursor_of(items[-1]) if items and (has_more or before) else None,
+        'previous_cursor': cursor_of(items[0]) if items and (after or (before and has_more)) else None,
+    }
@@ -0,0 +1,114 @@
+# school_core/read_states.py
+# Messages non lus par participant (ConversationReadState)
+#
+# Chaque participant a une ligne par conversation. Le compteur unread_count
+# est incrémenté par Conversation.register_post() et remis à zéro quand la
+# conversation est ouverte : les pastilles de la liste des conversations se
+# lisent en une requête indexée, sans COUNT par conversation.
+
+from collections import defaultdict
+
+from django.db.models import OuterRef, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Conversation, ConversationReadState, Post
+from .summaries import _count_subquery
+
+
+def create_read_states(pairs):
+    """
+    Crée les états de lecture manquants pour des couples (conversation_id, user_id).
+
+    Les publications déjà présentes ne comptent pas comme non lues : le
+    nouveau participant part de la dernière publication de la conversation.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+    last_posts = dict(
+        Conversation.objects.filter(
+            id__in={conversation_id for conversation_id, _ in pairs}
+        ).values_list('id', 'last_post_id')
+    )
+    ConversationReadState.objects.bulk_create([
+        ConversationReadState(
+            conversation_id=conversation_id,
+            user_id=user_id,
+            last_read_post_id=last_posts.get(conversation_id)
+        )
+        for conversation_id, user_id in pairs
+    ], ignore_conflicts=True)
+
+
+def delete_read_states(conversation_ids=None, user_ids=None):
+    states = ConversationReadState.objects.all()
+    if conversation_ids is not None:
+        states = states.filter(conversation_id__in=conversation_ids)
+    if user_ids is not None:
+        states = states.filter(user_id__in=user_ids)
+    states.delete()
+
+
+# Conversations par requête de delete_read_state_pairs : SQLite refuse les
+# expressions de plus de 1000 niveaux (une condition OR par conversation)
+PAIRS_CHUNK_SIZE = 200
+
+
+def delete_read_state_pairs(pairs):
+    """Supprime les états de lecture de couples (conversation_id, user_id) précis (une requête par lot de conversations)"""
+    users_by_conversation = defaultdict(set)
+    for conversation_id, user_id in pairs:
+        users_by_conversation[conversation_id].add(user_id)
+    conversations = list(users_by_conversation.items())
+    for start in range(0, len(conversations), PAIRS_CHUNK_SIZE):
+        condition = Q()
+        for conversation_id, user_ids in conversations[start:start + PAIRS_CHUNK_SIZE]:
+            condition |= Q(conversation_id=conversation_id, user_id__in=user_ids)
+        ConversationReadState.objects.filter(condition).delete()
+
+
+def mark_conversation_read(user, conversation):
+    """Remet à zéro le compteur de l'utilisateur (sans effet s'il n'est pas participant)"""
+    return ConversationReadState.objects.filter(
+        user_id=user.id, conversation_id=conversation.id
+    ).exclude(
+        unread_count=0, last_read_post_id=conversation.last_post_id
+    ).update(
+        unread_count=0,
+        last_read_post_id=conversation.last_post_id,
+        last_read_at=timezone.now()
+    )
+
+
+def unread_counts(user, conversation_ids=None):
+    """{conversation_id: nombre de non lus} pour les conversations ayant des non lus"""
+    states = ConversationReadState.objects.filter(user_id=user.id, unread_count__gt=0)
+    if conversation_ids is not None:
+        states = states.filter(conversation_id__in=conversation_ids)
+    return dict(states.values_list('conversation_id', 'unread_count'))
+
+
+def with_unread_counts(conversations, user):
+    """Évalue la liste de conversations et ajoute l'attribut unread_count à chacune"""
+    conversations = list(conversations)
+    counts = unread_counts(user, [conversation.id for conversation in conversations])
+    for conversation in conversations:
+        conversation.unread_count = counts.get(conversation.id, 0)
+    return conversations
+
+
+def refresh_unread_counts(conversation_ids=None):
+    """
+    Recalcule les compteurs à partir de last_read_post (un UPDATE) :
+    publications publiées plus récentes que la dernière lue, hors celles de l'utilisateur.
+    """
+    states = ConversationReadState.objects.all()
+    if conversation_ids is not None:
+        states = states.filter(conversation_id__in=conversation_ids)
+    unread = Post.objects.filter(
+        id__gt=Coalesce(OuterRef('last_read_post_id'), Value(0)),
+        conversation_id=OuterRef('conversation_id'),
+        is_published=True
+    ).exclude(author_id=OuterRef('user_id'))
+    return states.update(unread_count=_count_subquery(unread, 'conversation_id'))
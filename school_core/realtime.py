@@ -0,0 +1,176 @@
+# school_core/realtime.py
+# Diffusion en temps réel des nouvelles publications par WebSocket
+#
+# config/asgi.py envoie les connexions WebSocket /ws/conversations/<id>/ vers
+# websocket_application ; les vues publient les nouvelles publications sur le
+# groupe de la conversation via publish_post().
+#
+# La couche de diffusion est en mémoire : elle relie les connexions et les
+# vues d'un même processus ASGI (un serveur uvicorn/daphne par machine, ou les
+# tests). Les publications faites depuis un autre processus (worker WSGI,
+# `run_worker`) ne sont pas diffusées ; les clients les récupèrent alors via
+# l'API du fil (paramètre `after`).
+#
+# L'accès suit la règle des vues (participant, créateur ou directeur,
+# school_core/access.py) ; il est revérifié avant chaque envoi : un participant
+# retiré de la conversation voit sa connexion fermée au message suivant.
+
+import asyncio
+import json
+import re
+import threading
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections, transaction
+from django.http.request import validate_host
+
+from .access import AccessContext
+from .feed import serialize_post
+from .models import Conversation
+
+CONVERSATION_PATH = re.compile(r'^/ws/conversations/(?P<conversation_id>\d+)/$')
+
+
+class InMemoryChannelLayer:
+    """
+    Groupes d'abonnés en mémoire. publish() peut être appelé depuis n'importe
+    quel thread : chaque message est remis dans la boucle asyncio de l'abonné.
+    """
+
+    def __init__(self):
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, group):
+        queue = asyncio.Queue()
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._groups.setdefault(group, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, group, subscriber):
+        with self._lock:
+            subscribers = self._groups.get(group)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._groups[group]
+
+    def publish(self, group, message):
+        with self._lock:
+            subscribers = list(self._groups.get(group, ()))
+        for loop, queue in subscribers:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+        return len(subscribers)
+
+    def subscriber_count(self, group):
+        with self._lock:
+            return len(self._groups.get(group, ()))
+
+
+channel_layer = InMemoryChannelLayer()
+
+
+def conversation_group(conversation_id):
+    return f'conversation-{conversation_id}'
+
+
+def publish_post(post, event='post.created'):
+    """Diffuse une publication aux participants connectés, après validation de la transaction"""
+    message = {'type': event, 'post': serialize_post(post)}
+    group = conversation_group(post.conversation_id)
+    transaction.on_commit(lambda: channel_layer.publish(group, message))
+
+
+# --- Application ASGI -------------------------------------------------------
+
+def _headers(scope):
+    return {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+
+def _origin_allowed(headers):
+    """Refuse les connexions ouvertes depuis un autre site (même règle qu'ALLOWED_HOSTS)"""
+    origin = headers.get('origin')
+    if not origin:
+        return True
+    allowed_hosts = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed_hosts:
+        allowed_hosts = ['.localhost', '127.0.0.1', '[::1]']
+    return validate_host(urlsplit(origin).hostname or '', allowed_hosts)
+
+
+def _authorize(session_key, conversation_id):
+    """Retourne l'utilisateur s'il peut suivre la conversation, sinon None"""
+    close_old_connections()
+    try:
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        user = get_user(SimpleNamespace(session=session_store(session_key)))
+        if not user.is_authenticated or not AccessContext(user).can_view_conversation(conversation_id):
+            return None
+        return user if Conversation.objects.filter(id=conversation_id).exists() else None
+    finally:
+        close_old_connections()
+
+
+def _still_allowed(user, conversation_id):
+    """Accès revérifié avant un envoi (périmètre en cache, invalidé par les signaux)"""
+    close_old_connections()
+    try:
+        return AccessContext(user).can_view_conversation(conversation_id)
+    finally:
+        close_old_connections()
+
+
+async def websocket_application(scope, receive, send):
+    """WebSocket /ws/conversations/<id>/ : pousse les événements de la conversation"""
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    match = CONVERSATION_PATH.match(scope.get('path', ''))
+    headers = _headers(scope)
+    if match is None or not _origin_allowed(headers):
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+
+    cookies = SimpleCookie(headers.get('cookie', ''))
+    session_cookie = cookies.get(settings.SESSION_COOKIE_NAME)
+    conversation_id = int(match['conversation_id'])
+    user = None
+    if session_cookie is not None:
+        user = await sync_to_async(_authorize)(session_cookie.value, conversation_id)
+    if user is None:
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+
+    group = conversation_group(conversation_id)
+    subscriber = channel_layer.subscribe(group)
+    await send({'type': 'websocket.accept'})
+    _, queue = subscriber
+    try:
+        incoming = asyncio.ensure_future(receive())
+        outgoing = asyncio.ensure_future(queue.get())
+        while True:
+            done, _ = await asyncio.wait({incoming, outgoing}, return_when=asyncio.FIRST_COMPLETED)
+            if incoming in done:
+                if incoming.result()['type'] == 'websocket.disconnect':
+                    break
+                # Les messages du client (ex. ping) sont ignorés
+                incoming = asyncio.ensure_future(receive())
+            if outgoing in done:
+                if not await sync_to_async(_still_allowed)(user, conversation_id):
+                    await send({'type': 'websocket.close', 'code': 4403})
+                    break
+                await send({'type': 'websocket.send', 'text': json.dumps(outgoing.result())})
+                outgoing = asyncio.ensure_future(queue.get())
+    finally:
+        for pending in (incoming, outgoing):
+            pending.cancel()
+        channel_layer.unsubscribe(group, subscriber)
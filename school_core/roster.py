@@ -0,0 +1,78 @@
+# school_core/roster.py
+# Listes d'élèves de plusieurs classes (formulaires de création de conversation)
+#
+# classroom_rosters() sert toutes les classes demandées en une requête
+# agrégée. Chaque classe a un numéro de version dans le cache, remplacé par les
+# signaux (school_core/signals.py) quand un élève ou ses parents changent :
+# l'ETag de l'API en est dérivé sans requête SQL, et une liste inchangée
+# est confirmée par un 304 au lieu d'être renvoyée.
+
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Student
+
+VERSION_PREFIX = 'roster_version:'
+
+
+def _version_key(classroom_id):
+    return f'{VERSION_PREFIX}{classroom_id}'
+
+
+def classroom_rosters(classroom_ids, with_parent_ids=False):
+    """
+    {classroom_id: [élève]} pour les classes demandées (une requête), élèves
+    triés par nom. Chaque élève : id, first_name, last_name, parents_count et,
+    avec `with_parent_ids`, parent_ids.
+    """
+    rosters = {classroom_id: [] for classroom_id in classroom_ids}
+    students = Student.objects.filter(classroom_id__in=rosters).order_by('classroom_id', 'last_name', 'first_name', 'id')
+    if not with_parent_ids:
+        for row in students.values('id', 'first_name', 'last_name', 'classroom_id').annotate(parents_count=Count('parents')):
+            rosters[row.pop('classroom_id')].append(row)
+        return rosters
+
+    # Une ligne par couple (élève, parent) : regroupées ici plutôt qu'une requête par élève
+    last = None
+    for student_id, first_name, last_name, classroom_id, parent_id in students.values_list(
+        'id', 'first_name', 'last_name', 'classroom_id', 'parents__id'
+    ).order_by('classroom_id', 'last_name', 'first_name', 'id', 'parents__id'):
+        if last is None or last['id'] != student_id:
+            last = {'id': student_id, 'first_name': first_name, 'last_name': last_name, 'parents_count': 0, 'parent_ids': []}
+            rosters[classroom_id].append(last)
+        if parent_id is not None:
+            last['parent_ids'].append(parent_id)
+            last['parents_count'] += 1
+    return rosters
+
+
+def roster_versions(classroom_ids):
+    """{classroom_id: version} ; une version absente (jamais lue, évincée) est créée"""
+    keys = {_version_key(classroom_id): classroom_id for classroom_id in classroom_ids}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        cache.add(key, uuid.uuid4().hex, None)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def roster_etag(classroom_ids, with_parent_ids=False):
+    versions = roster_versions(classroom_ids)
+    signature = ','.join(f'{classroom_id}:{versions[classroom_id]}' for classroom_id in sorted(versions))
+    return hashlib.md5(f'{int(with_parent_ids)}|{signature}'.encode()).hexdigest()
+
+
+def invalidate_rosters(classroom_ids):
+    """
+    Les listes de ces classes ont changé : nouvelles versions, donc nouveaux ETag.
+    Aussi après validation : une version créée entre-temps par une requête qui
+    lisait encore l'ancienne liste ne doit pas rester associée à la nouvelle.
+    """
+    keys = [_version_key(classroom_id) for classroom_id in set(classroom_ids) if classroom_id]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
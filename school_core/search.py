@@ -0,0 +1,201 @@
+# school_core/search.py
+# Recherche plein texte dans les publications et les messages
+#
+# - SQLite : tables virtuelles FTS5 (school_core_post_fts, school_core_message_fts)
+#   créées par la migration 0010 et tenues à jour par les signaux ;
+#   classement par bm25.
+# - PostgreSQL : to_tsvector('french', ...) indexé en GIN (migration 0010),
+#   classement par ts_rank ; aucune table annexe à synchroniser.
+# - Autres bases : repli sur icontains.
+#
+# `python manage.py rebuild_search_index` reconstruit les tables FTS5
+# (nécessaire après des update()/bulk_create() qui ne déclenchent pas de signaux).
+
+import re
+
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Message, Post
+
+POST_FTS_TABLE = 'school_core_post_fts'
+MESSAGE_FTS_TABLE = 'school_core_message_fts'
+SEARCH_LIMIT = 50
+# Identifiants par requête lors d'une réindexation partielle
+REINDEX_BATCH_SIZE = 500
+
+# Les colonnes indexées de chaque modèle, dans l'ordre des tables FTS5
+INDEXED_FIELDS = {
+    Post: (POST_FTS_TABLE, ['title', 'description'], 'conversation_id'),
+    Message: (MESSAGE_FTS_TABLE, ['subject', 'content'], None),
+}
+# Poids bm25 : le titre / sujet compte double
+COLUMN_WEIGHTS = (2.0, 1.0)
+
+# Délimiteurs des extraits, remplacés par <mark> après échappement
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_END = '\x03'
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def search_backend():
+    return {'sqlite': 'fts5', 'postgresql': 'postgres'}.get(connection.vendor, 'like')
+
+
+def fts_query(text):
+    """
+    Transforme la saisie en requête FTS5 sûre : chaque mot devient un
+    préfixe entre guillemets ("cant"* trouve "cantine"), tous obligatoires.
+    """
+    return ' '.join(f'"{word}"*' for word in _WORD.findall(text))
+
+
+# --- Indexation (SQLite) ----------------------------------------------------
+
+def index_instance(instance):
+    if search_backend() != 'fts5':
+        return
+    table, fields, extra = INDEXED_FIELDS[type(instance)]
+    columns = ['rowid'] + fields + ([extra] if extra else [])
+    values = [instance.pk] + [getattr(instance, name) for name in fields + ([extra] if extra else [])]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [instance.pk])
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(values))})",
+            values
+        )
+
+
+def unindex_instance(instance):
+    if search_backend() != 'fts5':
+        return
+    table = INDEXED_FIELDS[type(instance)][0]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [instance.pk])
+
+
+def rebuild_index(model, ids=None):
+    """
+    Recopie les lignes du modèle dans sa table FTS5 (en SQL, sans charger les objets) :
+    toutes, ou seulement `ids` (ex. après un update() qui ne déclenche pas de signaux).
+    `ids` peut aussi être un queryset du modèle, utilisé comme sous-requête.
+    """
+    table, fields, extra = INDEXED_FIELDS[model]
+    columns = ', '.join(fields + ([extra] if extra else []))
+    copy = f"INSERT INTO {table} (rowid, {columns}) SELECT id, {columns} FROM {model._meta.db_table}"
+    with connection.cursor() as cursor:
+        if ids is None:
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(copy)
+            return
+        if isinstance(ids, QuerySet):
+            subquery, params = ids.values('id').query.sql_with_params()
+            cursor.execute(f"DELETE FROM {table} WHERE rowid IN ({subquery})", params)
+            cursor.execute(f"{copy} WHERE id IN ({subquery})", params)
+            return
+        ids = list(ids)
+        for start in range(0, len(ids), REINDEX_BATCH_SIZE):
+            batch = ids[start:start + REINDEX_BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"DELETE FROM {table} WHERE rowid IN ({placeholders})", batch)
+            cursor.execute(f"{copy} WHERE id IN ({placeholders})", batch)
+
+
+# --- Recherche --------------------------------------------------------------
+
+def _fts_matches(model, text, limit, conversation_id=None, published_only=False):
+    """
+    [(id, extrait)] classés par pertinence (bm25). Avec `published_only`, la
+    table du modèle est jointe : le LIMIT ne porte que sur les lignes publiées.
+    """
+    query = fts_query(text)
+    if not query:
+        return []
+    table, fields, extra = INDEXED_FIELDS[model]
+    source = ''
+    where = f"{table} MATCH %s"
+    params = [_HIGHLIGHT_START, _HIGHLIGHT_END, query]
+    if published_only:
+        source = f"JOIN {model._meta.db_table} AS source ON source.id = {table}.rowid"
+        where += " AND source.is_published"
+    if conversation_id is not None:
+        where += f" AND {table}.{extra} = %s"
+        params.append(conversation_id)
+    weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {table}.rowid, snippet({table}, -1, %s, %s, '…', 16) FROM {table} {source} "
+            f"WHERE {where} ORDER BY bm25({table}, {weights}) LIMIT %s",
+            params + [limit]
+        )
+        return cursor.fetchall()
+
+
+def _postgres_ranked(queryset, fields, text):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    vector = SearchVector(*fields, config='french')
+    query = SearchQuery(text, config='french', search_type='websearch')
+    return queryset.annotate(rank=SearchRank(vector, query)).filter(rank__gt=0).order_by('-rank')
+
+
+def _highlight(snippet):
+    return mark_safe(
+        escape(snippet).replace(_HIGHLIGHT_START, '<mark>').replace(_HIGHLIGHT_END, '</mark>')
+    )
+
+
+def _like_condition(fields, text):
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__icontains': text})
+    return condition
+
+
+def search_ids(model, text):
+    """
+    Sous-requête des identifiants correspondant à la recherche, sans limite
+    (filtre `id__in` : l'admin pagine toutes les correspondances)
+    """
+    backend = search_backend()
+    table, fields, _ = INDEXED_FIELDS[model]
+    if backend == 'fts5':
+        query = fts_query(text)
+        if not query:
+            return model.objects.none().values('id')
+        return RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [query])
+    if backend == 'postgres':
+        return _postgres_ranked(model.objects.all(), fields, text).order_by().values('id')
+    return model.objects.filter(_like_condition(fields, text)).values('id')
+
+
+def search_posts(text, conversation=None, limit=SEARCH_LIMIT):
+    """
+    Publications publiées correspondant à la recherche, classées par pertinence.
+    Chaque publication reçoit un attribut `search_snippet` (HTML, mots surlignés).
+    """
+    posts = Post.objects.filter(is_published=True).select_related('author')
+    if search_backend() == 'fts5':
+        matches = _fts_matches(Post, text, limit, conversation.id if conversation else None, published_only=True)
+        found = posts.in_bulk([post_id for post_id, _ in matches])
+        results = []
+        for post_id, snippet in matches:
+            post = found.get(post_id)
+            if post is not None:
+                post.search_snippet = _highlight(snippet)
+                results.append(post)
+        return results
+
+    fields = INDEXED_FIELDS[Post][1]
+    if conversation is not None:
+        posts = posts.filter(conversation=conversation)
+    if search_backend() == 'postgres':
+        results = list(_postgres_ranked(posts, fields, text)[:limit])
+    else:
+        results = list(posts.filter(_like_condition(fields, text)).order_by('-created_at')[:limit])
+    for post in results:
+        post.search_snippet = escape(post.description or post.title)
+    return results
@@ -0,0 +1,364 @@
+# school_core/signals.py
+# Signaux maintenant les données dénormalisées et les traitements de fond
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import stats
+from .access import invalidate_access, invalidate_all_access
+from .fragments import invalidate_people_fragments
+from .images import refresh_variants, variants_are_current
+from .membership import schedule_group_sync
+from .models import Classroom, Conversation, Message, Post, SchoolLevel, Student
+from .read_states import create_read_states, delete_read_states
+from .roster import invalidate_rosters
+from .search import index_instance, unindex_instance
+from .summaries import (
+    private_conversation_ids_for_users,
+    refresh_conversation_levels,
+    refresh_participant_counts,
+    touch_conversations,
+)
+from .tasks import enqueue
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def conversation_participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Met à jour participant_count et levels quand des participants sont ajoutés ou retirés"""
+    if action == 'pre_clear' and reverse:
+        # user.conversations.clear() : mémoriser les conversations concernées
+        instance._cleared_conversation_ids = list(
+            sender.objects.filter(customuser_id=instance.pk).values_list('conversation_id', flat=True)
+        )
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        # conversation.participants.add(...) : garder aussi l'instance à jour
+        instance.participant_count = sender.objects.filter(conversation_id=instance.pk).count()
+        instance.updated_at = timezone.now()
+        Conversation.objects.filter(pk=instance.pk).update(
+            participant_count=instance.participant_count, updated_at=instance.updated_at
+        )
+        refresh_conversation_levels([instance.pk])
+        return
+
+    if action == 'post_clear':
+        conversation_ids = getattr(instance, '_cleared_conversation_ids', [])
+    else:
+        conversation_ids = pk_set or []
+
+    if conversation_ids:
+        refresh_participant_counts(conversation_ids)
+        refresh_conversation_levels(conversation_ids)
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def conversation_participants_read_states(sender, instance, action, reverse, pk_set, **kwargs):
+    """Chaque participant a un état de lecture, supprimé quand il quitte la conversation"""
+    if action == 'post_add':
+        if reverse:
+            create_read_states((conversation_id, instance.pk) for conversation_id in pk_set)
+        else:
+            create_read_states((instance.pk, user_id) for user_id in pk_set)
+    elif action == 'post_remove':
+        if reverse:
+            delete_read_states(conversation_ids=pk_set, user_ids=[instance.pk])
+        else:
+            delete_read_states(conversation_ids=[instance.pk], user_ids=pk_set)
+    elif action == 'post_clear':
+        if reverse:
+            delete_read_states(user_ids=[instance.pk])
+        else:
+            delete_read_states(conversation_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Conversation)
+def conversation_saved(sender, instance, raw=False, **kwargs):
+    """La classe d'une conversation détermine son niveau"""
+    if not raw:
+        refresh_conversation_levels([instance.pk])
+
+
+def _refresh_levels_for_parents(parent_ids):
+    """
+    Les niveaux des discussions privées dépendent des classes des enfants des
+    participants, comme le périmètre des parents (school_core/access.py)
+    """
+    if parent_ids:
+        refresh_conversation_levels(private_conversation_ids_for_users(parent_ids))
+        invalidate_access(parent_ids)
+
+
+@receiver(post_save, sender=Classroom)
+def classroom_saved(sender, instance, created, raw=False, **kwargs):
+    """Changer le niveau d'une classe change celui de ses conversations"""
+    if raw or created:
+        return
+    refresh_conversation_levels(list(instance.conversations.values_list('id', flat=True)))
+    _refresh_levels_for_parents(
+        list(Student.parents.through.objects.filter(student__classroom=instance).values_list('customuser_id', flat=True))
+    )
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Nouvelle classe : niveaux et périmètres des parents (un changement de nom n'y touche pas)"""
+    if raw or (update_fields is not None and 'classroom' not in update_fields):
+        return
+    if created or instance.previous_classroom_id != instance.classroom_id:
+        _refresh_levels_for_parents(list(instance.parents.values_list('id', flat=True)))
+
+
+@receiver(pre_delete, sender=Student)
+def student_deleting(sender, instance, **kwargs):
+    # Les liens vers les parents sont supprimés avec l'élève : les mémoriser avant
+    instance._deleted_parent_ids = list(instance.parents.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    _refresh_levels_for_parents(getattr(instance, '_deleted_parent_ids', []))
+
+
+@receiver(m2m_changed, sender=Student.parents.through)
+def student_parents_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # parent.children.add(...) : le parent est l'instance
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _refresh_levels_for_parents([instance.pk])
+        return
+
+    if action == 'pre_clear':
+        instance._cleared_parent_ids = list(instance.parents.values_list('id', flat=True))
+    elif action == 'post_clear':
+        _refresh_levels_for_parents(getattr(instance, '_cleared_parent_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        _refresh_levels_for_parents(list(pk_set or []))
+
+
+@receiver(post_save, sender=Post)
+def post_image_saved(sender, instance, raw=False, **kwargs):
+    """La photo d'une publication est déclinée en tâche de fond (miniature, fil, plein écran)"""
+    if raw or variants_are_current(instance.image):
+        return
+    if not instance.image:
+        refresh_variants(instance, 'image')
+        return
+    if instance.status != 'processing':
+        instance.status = 'processing'
+        Post.objects.filter(pk=instance.pk).update(status='processing')
+    enqueue('process_post_image', post_id=instance.pk)
+
+
+@receiver(post_save, sender=Student)
+def student_photo_saved(sender, instance, raw=False, **kwargs):
+    if raw or variants_are_current(instance.photo):
+        return
+    if instance.photo:
+        enqueue('process_student_photo', student_id=instance.pk)
+    else:
+        refresh_variants(instance, 'photo')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, created=False, raw=False, **kwargs):
+    """Publication modifiée ou supprimée (une création passe par Conversation.register_post)"""
+    if not created and not raw:
+        touch_conversations([instance.conversation_id])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Message)
+def search_instance_saved(sender, instance, **kwargs):
+    """Tient à jour l'index plein texte (tables FTS5 sous SQLite)"""
+    index_instance(instance)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Message)
+def search_instance_deleted(sender, instance, **kwargs):
+    unindex_instance(instance)
+
+
+# --- Composition des groupes de classe (school_core/membership.py) ----------
+
+@receiver(post_save, sender=Student)
+def student_classroom_changed(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Changement de classe : les parents quittent l'ancien groupe et rejoignent le nouveau"""
+    if raw or created or (update_fields is not None and 'classroom' not in update_fields):
+        return
+    previous = instance.previous_classroom_id
+    if previous != instance.classroom_id:
+        parent_ids = instance.parents.values_list('id', flat=True)
+        schedule_group_sync(
+            [previous, instance.classroom_id], removable=[(previous, parent_id) for parent_id in parent_ids]
+        )
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted_group_sync(sender, instance, **kwargs):
+    parent_ids = getattr(instance, '_deleted_parent_ids', [])
+    schedule_group_sync(
+        [instance.classroom_id], removable=[(instance.classroom_id, parent_id) for parent_id in parent_ids]
+    )
+
+
+@receiver(m2m_changed, sender=Student.parents.through)
+def student_parents_group_sync(sender, instance, action, reverse, pk_set, **kwargs):
+    """Parents ajoutés ou retirés : mettre à jour le groupe de la classe de l'élève"""
+    if not reverse:
+        # Seuls les parents retirés de l'élève peuvent quitter le groupe
+        removed = []
+        if action == 'post_remove':
+            removed = pk_set or []
+        elif action == 'post_clear':
+            removed = getattr(instance, '_cleared_parent_ids', [])
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_group_sync(
+                [instance.classroom_id], removable=[(instance.classroom_id, parent_id) for parent_id in removed]
+            )
+        return
+    # parent.children.add(...) / remove / clear : les classes des élèves concernés
+    if action == 'pre_clear':
+        instance._cleared_children_classroom_ids = list(
+            instance.children.values_list('classroom_id', flat=True)
+        )
+    elif action == 'post_clear':
+        classroom_ids = getattr(instance, '_cleared_children_classroom_ids', [])
+        schedule_group_sync(classroom_ids, removable=[(classroom_id, instance.pk) for classroom_id in classroom_ids])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        classroom_ids = list(Student.objects.filter(pk__in=pk_set).values_list('classroom_id', flat=True))
+        removable = [(classroom_id, instance.pk) for classroom_id in classroom_ids] if action == 'post_remove' else []
+        schedule_group_sync(classroom_ids, removable=removable)
+
+
+@receiver(pre_save, sender=Classroom)
+def classroom_teacher_changing(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None or (update_fields is not None and 'teacher' not in update_fields):
+        return
+    instance._previous_teacher_id = (
+        Classroom.objects.filter(pk=instance.pk).values_list('teacher_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Classroom)
+def classroom_group_sync(sender, instance, created, raw=False, **kwargs):
+    """Nouvelle classe : son groupe est créé ; nouvel enseignant : il remplace l'ancien dans le groupe"""
+    if raw:
+        return
+    previous = instance.__dict__.get('_previous_teacher_id', instance.teacher_id)
+    if created or previous != instance.teacher_id:
+        schedule_group_sync([instance.pk], removable=[(instance.pk, previous)])
+
+
+# --- Périmètre des utilisateurs (school_core/access.py) ----------------------
+# Les parents sont traités avec les niveaux des conversations (_refresh_levels_for_parents)
+
+@receiver(post_save, sender=Classroom)
+@receiver(post_delete, sender=Classroom)
+def classroom_access(sender, instance, **kwargs):
+    """
+    Classe créée, modifiée ou supprimée : son enseignant, les parents de ses
+    élèves et les directeurs (toutes les classes) sont concernés, tout invalider
+    """
+    instance.__dict__.pop('_previous_teacher_id', None)
+    invalidate_all_access()
+
+
+@receiver(post_save, sender=SchoolLevel)
+@receiver(post_delete, sender=SchoolLevel)
+def level_set_changed(sender, instance, created=True, **kwargs):
+    if created:
+        invalidate_all_access()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_roles_access(sender, instance, created, update_fields=None, **kwargs):
+    """Devenir (ou ne plus être) directeur change le périmètre"""
+    if not created and update_fields != frozenset({'last_login'}):
+        invalidate_access([instance.pk])
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def conversation_participants_access(sender, instance, action, reverse, pk_set, **kwargs):
+    """Rejoindre ou quitter une conversation change les conversations visibles"""
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_access([instance.pk])
+    elif action == 'pre_clear':
+        instance._cleared_participant_ids = list(
+            sender.objects.filter(conversation_id=instance.pk).values_list('customuser_id', flat=True)
+        )
+    elif action == 'post_clear':
+        invalidate_access(instance.__dict__.pop('_cleared_participant_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_access(pk_set or [])
+
+
+@receiver(post_save, sender=Conversation)
+def conversation_created_access(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        invalidate_access([instance.created_by_id])
+
+
+@receiver(pre_delete, sender=Conversation)
+def conversation_deleting_access(sender, instance, **kwargs):
+    # Les participations sont supprimées sans signal m2m_changed
+    invalidate_access([
+        instance.created_by_id,
+        *Conversation.participants.through.objects.filter(conversation_id=instance.pk).values_list('customuser_id', flat=True)
+    ])
+
+
+# --- Fragments du messenger (school_core/fragments.py) ----------------------
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_people_fragments(sender, instance, update_fields=None, **kwargs):
+    """Nom ou rôle modifié, compte supprimé : les panneaux des participants sont à refaire"""
+    if update_fields != frozenset({'last_login'}):
+        invalidate_people_fragments()
+
+
+# --- Listes d'élèves par classe (school_core/roster.py) ---------------------
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def student_roster_changed(sender, instance, **kwargs):
+    """Élève créé, modifié (nom, classe) ou supprimé : sa classe, et l'ancienne"""
+    invalidate_rosters([instance.classroom_id, instance.previous_classroom_id])
+
+
+@receiver(m2m_changed, sender=Student.parents.through)
+def student_parents_roster(sender, instance, action, reverse, pk_set, **kwargs):
+    """Nombre et identifiants des parents affichés dans la liste"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_rosters([instance.classroom_id])
+    elif action == 'post_clear':
+        # Classes mémorisées par student_parents_group_sync (pre_clear)
+        invalidate_rosters(getattr(instance, '_cleared_children_classroom_ids', []))
+    elif pk_set:
+        invalidate_rosters(Student.objects.filter(pk__in=pk_set).values_list('classroom_id', flat=True))
+
+
+# --- Compteurs du tableau de bord (school_core/stats.py) ---------------------
+
+def stats_instance_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    stats.instance_saved(instance, created, raw, update_fields)
+
+
+def stats_instance_deleted(sender, instance, **kwargs):
+    stats.instance_deleted(instance)
+
+
+for _model in stats.stat_rules():
+    post_save.connect(stats_instance_saved, sender=_model, dispatch_uid=f'stats_saved_{_model._meta.label}')
+    post_delete.connect(stats_instance_deleted, sender=_model, dispatch_uid=f'stats_deleted_{_model._meta.label}')
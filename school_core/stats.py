@@ -0,0 +1,133 @@
+# school_core/stats.py
+# Compteurs du tableau de bord administrateur, conservés dans le cache Django
+#
+# Chaque compteur est calculé une fois (COUNT), puis tenu à jour par les
+# signaux (school_core/signals.py) : +1 à la création, -1 à la suppression,
+# invalidation quand une modification peut changer le filtre (ex. publication
+# dépubliée). La commande `refresh_dashboard_stats` recalcule tout et peut
+# être lancée périodiquement pour corriger les écarts (update()/bulk_create()
+# ne déclenchent pas de signaux).
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Classroom, Conversation, Message, Post, SchoolLevel, Student
+
+CACHE_PREFIX = 'school_stats:'
+# Durée de vie maximale d'un compteur : au-delà il est recalculé à la lecture
+STATS_TIMEOUT = getattr(settings, 'SCHOOL_STATS_TIMEOUT', 6 * 3600)
+
+
+def _stat_queries():
+    """Nom du compteur -> requête comptée"""
+    User = get_user_model()
+    return {
+        'total_students': Student.objects.all(),
+        'total_teachers': User.objects.filter(is_teacher=True),
+        'total_parents': User.objects.filter(is_parent=True),
+        'total_classes': Classroom.objects.all(),
+        'total_levels': SchoolLevel.objects.all(),
+        'total_conversations': Conversation.objects.all(),
+        'total_posts': Post.objects.filter(is_published=True),
+        'unread_messages': Message.objects.filter(is_read=False),
+    }
+
+
+# Champs lus par la condition de chaque compteur filtré : une modification
+# limitée à d'autres champs (ex. last_login à la connexion) ne l'invalide pas
+FILTER_FIELDS = {
+    'total_teachers': {'is_teacher'},
+    'total_parents': {'is_parent'},
+    'total_posts': {'is_published'},
+    'unread_messages': {'is_read'},
+}
+
+
+def stat_rules():
+    """
+    Modèle -> [(compteur, condition)] : la condition (même filtre que la
+    requête ci-dessus, champs dans FILTER_FIELDS) dit si une instance est
+    comptée ; None = toujours.
+    """
+    return {
+        Student: [('total_students', None)],
+        get_user_model(): [
+            ('total_teachers', lambda user: user.is_teacher),
+            ('total_parents', lambda user: user.is_parent),
+        ],
+        Classroom: [('total_classes', None)],
+        SchoolLevel: [('total_levels', None)],
+        Conversation: [('total_conversations', None)],
+        Post: [('total_posts', lambda post: post.is_published)],
+        Message: [('unread_messages', lambda message: not message.is_read)],
+    }
+
+
+def _key(name):
+    return f'{CACHE_PREFIX}{name}'
+
+
+def get_dashboard_stats():
+    """Tous les compteurs : lus dans le cache, seuls les absents sont recalculés"""
+    queries = _stat_queries()
+    cached = cache.get_many([_key(name) for name in queries])
+    stats = {}
+    missing = {}
+    for name, queryset in queries.items():
+        value = cached.get(_key(name))
+        if value is None:
+            value = missing[_key(name)] = queryset.count()
+        stats[name] = value
+    if missing:
+        cache.set_many(missing, STATS_TIMEOUT)
+    return stats
+
+
+def recompute_dashboard_stats():
+    """Recalcule et remplace tous les compteurs"""
+    stats = {name: queryset.count() for name, queryset in _stat_queries().items()}
+    cache.set_many({_key(name): value for name, value in stats.items()}, STATS_TIMEOUT)
+    return stats
+
+
+def _adjust(names, delta):
+    for name in names:
+        try:
+            cache.incr(_key(name), delta)
+        except ValueError:
+            # Compteur absent du cache : il sera recalculé à la prochaine lecture
+            pass
+
+
+def adjust_stats(names, delta):
+    """Incrémente les compteurs après validation de la transaction"""
+    if names:
+        transaction.on_commit(lambda: _adjust(names, delta))
+
+
+def invalidate_stats(names):
+    """Supprime les compteurs (recalculés à la prochaine lecture) après validation"""
+    if names:
+        transaction.on_commit(lambda: cache.delete_many([_key(name) for name in names]))
+
+
+def instance_saved(instance, created, raw=False, update_fields=None):
+    rules = stat_rules().get(type(instance), [])
+    if created and not raw:
+        adjust_stats([name for name, counted in rules if counted is None or counted(instance)], 1)
+    elif raw:
+        invalidate_stats([name for name, _ in rules])
+    else:
+        # Une modification ne change que les compteurs filtrés (ex. is_published),
+        # et seulement si elle peut toucher les champs du filtre
+        invalidate_stats([
+            name for name, counted in rules
+            if counted is not None and (update_fields is None or FILTER_FIELDS[name] & set(update_fields))
+        ])
+
+
+def instance_deleted(instance):
+    rules = stat_rules().get(type(instance), [])
+    adjust_stats([name for name, counted in rules if counted is None or counted(instance)], -1)
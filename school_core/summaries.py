@@ -0,0 +1,131 @@
+# school_core/summaries.py
+# Maintenance du résumé dénormalisé des conversations
+# (nombre de publications, nombre de participants, dernière publication)
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, NullIf, Substr
+from django.utils import timezone
+
+from .models import Conversation, Post, POST_IMAGE_PREVIEW, POST_PREVIEW_LENGTH
+
+
+def _count_subquery(queryset, field):
+    """Sous-requête COUNT corrélée, à utiliser dans un UPDATE"""
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values(field).annotate(total=Count('*')).values('total'),
+            output_field=IntegerField()
+        ),
+        Value(0)
+    )
+
+
+def refresh_participant_counts(conversation_ids):
+    """Recalcule participant_count pour les conversations données (une requête)"""
+    through = Conversation.participants.through
+    return Conversation.objects.filter(id__in=conversation_ids).update(
+        participant_count=_count_subquery(
+            through.objects.filter(conversation_id=OuterRef('pk')), 'conversation_id'
+        ),
+        updated_at=timezone.now()
+    )
+
+
+def touch_conversations(conversation_ids):
+    """Le contenu affiché de ces conversations a changé (voir Conversation.updated_at)"""
+    conversation_ids = {conversation_id for conversation_id in conversation_ids if conversation_id}
+    if conversation_ids:
+        Conversation.objects.filter(id__in=conversation_ids).update(updated_at=timezone.now())
+
+
+def refresh_conversation_summaries(conversation_ids=None):
+    """
+    Reconstruit entièrement le résumé des conversations.
+
+    Tout est calculé en SQL (UPDATE ... = (SELECT ...)), sans charger les
+    conversations en mémoire. Sans argument, toutes les conversations sont traitées.
+    """
+    conversations = Conversation.objects.all()
+    if conversation_ids is not None:
+        conversations = conversations.filter(id__in=conversation_ids)
+
+    published = Post.objects.filter(conversation_id=OuterRef('pk'), is_published=True)
+    last_post = published.order_by('-created_at', '-id')
+    through = Conversation.participants.through
+
+    updated = conversations.update(
+        post_count=_count_subquery(published, 'conversation_id'),
+        participant_count=_count_subquery(
+            through.objects.filter(conversation_id=OuterRef('pk')), 'conversation_id'
+        ),
+        last_post=Subquery(last_post.values('id')[:1]),
+        last_message_at=Coalesce(Subquery(last_post.values('created_at')[:1]), F('last_message_at')),
+        last_message_preview=Coalesce(
+            Subquery(
+                last_post.annotate(
+                    preview=Substr(
+                        Coalesce(NullIf('description', Value('')), NullIf('title', Value('')), Value(POST_IMAGE_PREVIEW)),
+                        1,
+                        POST_PREVIEW_LENGTH
+                    )
+                ).values('preview')[:1]
+            ),
+            Value('')
+        ),
+        updated_at=timezone.now(),
+    )
+    return updated
+
+
+def refresh_conversation_levels(conversation_ids=None):
+    """
+    Recalcule Conversation.levels pour les conversations données.
+
+    - conversation liée à une classe : le niveau de la classe
+    - sinon : les niveaux des classes des enfants des participants
+
+    Seule la différence avec l'état actuel est appliquée
+    (un INSERT groupé et un DELETE au plus).
+    """
+    conversations = Conversation.objects.all()
+    if conversation_ids is not None:
+        if not conversation_ids:
+            return
+        conversations = conversations.filter(id__in=conversation_ids)
+
+    desired = set(
+        conversations.filter(classroom__isnull=False).values_list('id', 'classroom__level_id')
+    )
+    participants = Conversation.participants.through.objects.filter(
+        conversation__in=conversations,
+        conversation__classroom__isnull=True,
+        customuser__children__classroom__isnull=False
+    )
+    desired.update(
+        participants.values_list('conversation_id', 'customuser__children__classroom__level_id').distinct()
+    )
+
+    through = Conversation.levels.through
+    links = through.objects.filter(conversation__in=conversations)
+    existing = {
+        (conversation_id, level_id): link_id
+        for link_id, conversation_id, level_id in links.values_list('id', 'conversation_id', 'schoollevel_id')
+    }
+
+    obsolete = [link_id for pair, link_id in existing.items() if pair not in desired]
+    if obsolete:
+        through.objects.filter(id__in=obsolete).delete()
+    through.objects.bulk_create([
+        through(conversation_id=conversation_id, schoollevel_id=level_id)
+        for conversation_id, level_id in desired - existing.keys()
+    ])
+
+
+def private_conversation_ids_for_users(user_ids):
+    """Conversations sans classe auxquelles participent ces utilisateurs"""
+    return list(
+        Conversation.participants.through.objects.filter(
+            customuser_id__in=user_ids,
+            conversation__classroom__isnull=True
+        ).values_list('conversation_id', flat=True).distinct()
+    )
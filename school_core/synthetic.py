@@ -0,0 +1,311 @@
+# school_core/synthetic.py
+# Génération d'une école fictive en masse (mesures de performance, jeux d'essai)
+#
+# Tout est inséré par bulk_create, par lots : ni save() ni signaux. Les
+# données dénormalisées (résumés et niveaux des conversations, états de
+# lecture, index plein texte, compteurs du tableau de bord) sont recalculées
+# à la fin, en SQL.
+
+import math
+import random
+from contextlib import contextmanager
+from datetime import date, timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.utils import name_keys, username_key
+from .access import invalidate_all_access
+from .models import Classroom, Conversation, Message, Post, SchoolLevel, Student
+from .read_states import create_read_states
+from .search import rebuild_index
+from .stats import recompute_dashboard_stats
+from .summaries import refresh_conversation_levels, refresh_conversation_summaries
+
+# (slug, nom, description, classes, âge des élèves de la première classe)
+LEVELS = [
+    ('maternelle', 'Maternelle', 'Petite, Moyenne et Grande Section', ['PS', 'MS', 'GS'], 3),
+    ('primaire', 'Primaire', 'Du CP au CM2', ['CP', 'CE1', 'CE2', 'CM1', 'CM2'], 6),
+    ('college', 'Collège', 'De la 6ème à la 3ème', ['6e', '5e', '4e', '3e'], 11),
+]
+FIRST_NAMES = [
+    'Léa', 'Hugo', 'Chloé', 'Lucas', 'Emma', 'Louis', 'Inès', 'Gabriel', 'Jade', 'Raphaël',
+    'Zoé', 'Arthur', 'Éloïse', 'Jules', 'Manon', 'Adam', 'Lina', 'Nathan', 'Anaïs', 'Théo',
+    'Camille', 'Paul', 'Juliette', 'Maxime', 'Alice', 'Noah', 'Clara', 'Mathis', 'Sarah', 'Antoine',
+]
+LAST_NAMES = [
+    'Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand', 'Leroy', 'Moreau',
+    'Simon', 'Laurent', 'Lefèvre', 'Michel', 'Garcia', 'David', 'Bertrand', 'Roux', 'Vincent', 'Fournier',
+    'Morel', 'Girard', 'André', 'Mercier', 'Dupont', 'Lambert', 'Bonnet', 'François', 'Martinez', 'Legrand',
+]
+POST_TEXTS = [
+    'Sortie au musée jeudi, pensez au pique-nique.',
+    'Photos de l\'atelier peinture de ce matin.',
+    'Rappel : réunion parents-professeurs mardi à 18h.',
+    'Les cahiers de liaison sont à signer pour vendredi.',
+    'Bravo à tous pour le spectacle de fin d\'année !',
+    'Menu de la cantine de la semaine prochaine en pièce jointe.',
+    'Pensez aux bottes de pluie pour la sortie en forêt.',
+    'Les évaluations de mathématiques sont corrigées.',
+]
+PRIVATE_TEXTS = [
+    'Bonjour, pouvons-nous convenir d\'un rendez-vous ?',
+    'Merci pour votre message, c\'est noté.',
+    'Votre enfant a fait de beaux progrès ce trimestre.',
+    'Il sera absent demain pour un rendez-vous médical.',
+]
+# Fratries : nombre d'enfants par famille et probabilité
+FAMILY_SIZES = ([1, 2, 3], [55, 35, 10])
+# Les publications sont réparties sur cette période
+HISTORY = timedelta(days=180)
+BATCH_SIZE = 1000
+# Mot de passe commun des comptes générés (haché une seule fois)
+SYNTHETIC_PASSWORD = 'demo123'
+
+
+def bulk_insert(model, objects, batch_size=BATCH_SIZE, keep=True):
+    """
+    Insère un itérable d'objets par lots, sans le charger entièrement en mémoire.
+    Retourne les objets créés (avec leur id), ou seulement leur nombre si keep=False.
+    """
+    objects = iter(objects)
+    created = []
+    count = 0
+    while batch := list(islice(objects, batch_size)):
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        count += len(batch)
+        if keep:
+            created.extend(batch)
+    return created if keep else count
+
+
+@contextmanager
+def explicit_created_at(*models):
+    """Suspend auto_now_add de created_at : bulk_create garde les dates fournies"""
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _person(model, first_name, last_name, **fields):
+    first_name_key, last_name_key = name_keys(first_name, last_name)
+    return model(
+        first_name=first_name, last_name=last_name,
+        first_name_key=first_name_key, last_name_key=last_name_key,
+        **fields
+    )
+
+
+def _user(username, first_name, last_name, password, **roles):
+    return _person(
+        get_user_model(), first_name, last_name,
+        username=username, username_key=username_key(username), email=f'{username}@ecole.test', password=password, **roles
+    )
+
+
+def refresh_denormalized_data(conversation_ids=None):
+    """Recalcule tout ce que les signaux maintiennent d'habitude (après des insertions en masse)"""
+    refresh_conversation_summaries(conversation_ids)
+    refresh_conversation_levels(conversation_ids)
+    conversations = Conversation.participants.through.objects.all()
+    if conversation_ids is not None:
+        conversations = conversations.filter(conversation_id__in=conversation_ids)
+    create_read_states(conversations.values_list('conversation_id', 'customuser_id'))
+    rebuild_index(Post)
+    rebuild_index(Message)
+    recompute_dashboard_stats()
+    invalidate_all_access()
+
+
+def build_school(students=300, students_per_classroom=25, posts_per_classroom=50, private_per_classroom=2,
+                 messages_per_classroom=5, seed=0, prefix='synth', password=SYNTHETIC_PASSWORD,
+                 batch_size=BATCH_SIZE, log=None):
+    """
+    Crée une école fictive :
+    - les trois niveaux et assez de classes pour `students` élèves, un enseignant par classe ;
+    - des familles de un à trois enfants (répartis dans toute l'école) et un ou deux parents ;
+    - le groupe de chaque classe (enseignant + parents) et ses publications ;
+    - des discussions privées enseignant / parent et des messages directs.
+
+    Les noms d'utilisateur commencent par `prefix` ; tous les comptes ont le
+    même mot de passe. Le générateur est déterministe pour une `seed` donnée.
+    `log` (optionnel) reçoit un message à chaque étape.
+
+    Retourne un dictionnaire avec des comptes représentatifs (directeur, un
+    enseignant et une classe par niveau, un parent) et le nombre d'objets créés.
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+    hashed_password = make_password(password)
+    now = timezone.now()
+    log = log or (lambda message: None)
+
+    def insert(model, objects, keep=True):
+        return bulk_insert(model, objects, batch_size=batch_size, keep=keep)
+
+    def moment():
+        return now - timedelta(seconds=rng.randrange(int(HISTORY.total_seconds())))
+
+    with transaction.atomic():
+        director = User.objects.create_user(
+            f'{prefix}-directeur', password=password, first_name='Claire', last_name='Directrice',
+            is_director=True
+        )
+
+        # Classes réparties entre les niveaux, un enseignant par classe
+        levels = {}
+        for slug, level_name, description, _, _ in LEVELS:
+            levels[slug], _ = SchoolLevel.objects.get_or_create(
+                slug=slug, defaults={'name': level_name, 'description': description}
+            )
+        classrooms = []
+        ages = []
+        for index in range(max(1, math.ceil(students / students_per_classroom))):
+            slug, _, _, class_names, first_age = LEVELS[index % len(LEVELS)]
+            position = index // len(LEVELS)
+            grade = position % len(class_names)
+            section = chr(ord('A') + position // len(class_names) % 26)
+            classrooms.append(Classroom(level=levels[slug], name=f'{class_names[grade]} {section}'))
+            ages.append(first_age + grade)
+        teachers = insert(User, (
+            _user(f'{prefix}-prof-{index}', rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), hashed_password,
+                  is_teacher=True)
+            for index in range(len(classrooms))
+        ))
+        for classroom, teacher in zip(classrooms, teachers):
+            classroom.teacher = teacher
+        classrooms = insert(Classroom, classrooms)
+        log(f'{len(classrooms)} classes et enseignants')
+
+        # Familles : les places des classes sont tirées au hasard, les frères
+        # et sœurs se retrouvent donc souvent dans des niveaux différents
+        seats = [index for index in range(len(classrooms)) for _ in range(students_per_classroom)][:students]
+        rng.shuffle(seats)
+        families = []
+        while seats:
+            children = min(rng.choices(*FAMILY_SIZES)[0], len(seats))
+            last_name = rng.choice(LAST_NAMES)
+            families.append((
+                last_name,
+                [seats.pop() for _ in range(children)],
+                [rng.choice(FIRST_NAMES) for _ in range(1 if rng.random() < 0.25 else 2)]
+            ))
+
+        student_objects = []
+        for last_name, classroom_indexes, _ in families:
+            for classroom_index in classroom_indexes:
+                age = ages[classroom_index]
+                student_objects.append(_person(
+                    Student, rng.choice(FIRST_NAMES), last_name, classroom=classrooms[classroom_index],
+                    date_of_birth=date(now.year - age - 1, rng.randint(1, 12), rng.randint(1, 28))
+                ))
+        students_created = insert(Student, student_objects)
+        parent_users = insert(User, (
+            _user(f'{prefix}-parent-{index}-{number}', first_name, last_name, hashed_password, is_parent=True)
+            for index, (last_name, _, first_names) in enumerate(families)
+            for number, first_name in enumerate(first_names)
+        ))
+
+        # Liens élève / parent, et parents de chaque classe
+        links = []
+        class_parents = [set() for _ in classrooms]
+        student_iter = iter(students_created)
+        parent_iter = iter(parent_users)
+        for _, classroom_indexes, first_names in families:
+            family_parents = [next(parent_iter) for _ in first_names]
+            for classroom_index in classroom_indexes:
+                student = next(student_iter)
+                for parent in family_parents:
+                    links.append(Student.parents.through(student_id=student.id, customuser_id=parent.id))
+                    class_parents[classroom_index].add(parent.id)
+        insert(Student.parents.through, links)
+        log(f'{len(students_created)} élèves, {len(parent_users)} parents')
+
+        # Groupe de chaque classe, discussions privées enseignant / parent
+        parents_by_id = {parent.id: parent for parent in parent_users}
+        conversations = []
+        members = []
+        for classroom, parent_ids in zip(classrooms, class_parents):
+            conversations.append(Conversation(
+                name=f'Groupe {classroom.name}', conversation_type='group',
+                classroom=classroom, created_by=classroom.teacher
+            ))
+            members.append([classroom.teacher_id] + sorted(parent_ids))
+            for parent_id in rng.sample(sorted(parent_ids), min(private_per_classroom, len(parent_ids))):
+                conversations.append(Conversation(
+                    name=f'{classroom.teacher.get_full_name()} / {parents_by_id[parent_id].get_full_name()}',
+                    conversation_type='private', created_by=classroom.teacher
+                ))
+                members.append([classroom.teacher_id, parent_id])
+        conversations = insert(Conversation, conversations)
+        insert(Conversation.participants.through, (
+            Conversation.participants.through(conversation_id=conversation.id, customuser_id=user_id)
+            for conversation, user_ids in zip(conversations, members)
+            for user_id in user_ids
+        ))
+        log(f'{len(conversations)} conversations')
+
+        # Publications (générées au fil de l'insertion) : surtout de l'enseignant
+        # dans les groupes, en alternance dans les discussions privées
+        def posts():
+            for conversation, user_ids in zip(conversations, members):
+                if conversation.conversation_type == 'group':
+                    count, texts = posts_per_classroom, POST_TEXTS
+                else:
+                    count, texts = max(1, posts_per_classroom // 10), PRIVATE_TEXTS
+                for created_at in sorted(moment() for _ in range(count)):
+                    if len(user_ids) > 1 and rng.random() >= (0.8 if conversation.classroom_id else 0.5):
+                        author_id = rng.choice(user_ids[1:])
+                    else:
+                        author_id = user_ids[0]
+                    yield Post(
+                        author_id=author_id, conversation_id=conversation.id,
+                        description=rng.choice(texts), is_published=rng.random() >= 0.02,
+                        created_at=created_at
+                    )
+
+        def messages():
+            for classroom, parent_ids in zip(classrooms, class_parents):
+                parent_ids = sorted(parent_ids)
+                for _ in range(messages_per_classroom if parent_ids else 0):
+                    users = [classroom.teacher_id, rng.choice(parent_ids)]
+                    rng.shuffle(users)
+                    yield Message(
+                        sender_id=users[0], recipient_id=users[1], subject='Information',
+                        content=rng.choice(PRIVATE_TEXTS), is_read=rng.random() < 0.7, created_at=moment()
+                    )
+
+        with explicit_created_at(Post, Message):
+            post_count = insert(Post, posts(), keep=False)
+            log(f'{post_count} publications')
+            message_count = insert(Message, messages(), keep=False)
+
+        refresh_denormalized_data()
+        log('Résumés, niveaux, états de lecture, index et compteurs recalculés')
+
+    first_classrooms = {}
+    for classroom in classrooms:
+        first_classrooms.setdefault(classroom.level.slug, classroom)
+    return {
+        'director': director,
+        'teachers': {slug: classroom.teacher for slug, classroom in first_classrooms.items()},
+        'classrooms': first_classrooms,
+        'parent': parent_users[0] if parent_users else None,
+        'counts': {
+            'classrooms': len(classrooms),
+            'teachers': len(teachers),
+            'students': len(students_created),
+            'parents': len(parent_users),
+            'conversations': len(conversations),
+            'posts': post_count,
+            'messages': message_count,
+        },
+    }
@@ -0,0 +1,146 @@
+# school_core/tasks.py
+# File d'attente de tâches de fond stockée en base (aucun broker externe)
+#
+# Les vues enregistrent une tâche avec enqueue() et rendent la main
+# immédiatement ; la commande `python manage.py run_worker` exécute les tâches
+# en attente, avec nouvelles tentatives espacées (backoff exponentiel).
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .images import has_variants, refresh_variants
+from .models import Post, Student, Task
+from .realtime import publish_post
+from .summaries import touch_conversations
+
+logger = logging.getLogger(__name__)
+
+# Délai avant la 1re nouvelle tentative, doublé à chaque échec
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=1)
+# Une tâche "en cours" depuis plus longtemps est considérée comme abandonnée
+STALE_TASK_TIMEOUT = timedelta(minutes=10)
+
+_registry = {}
+
+
+def task(name, on_failure=None):
+    """
+    Enregistre une fonction comme tâche de fond.
+
+    `on_failure(**payload)` est appelé quand toutes les tentatives ont échoué.
+    """
+    def decorator(func):
+        _registry[name] = (func, on_failure)
+        return func
+    return decorator
+
+
+def enqueue(name, max_attempts=5, **payload):
+    """
+    Ajoute une tâche à la file. Avec le réglage SCHOOL_TASKS_EAGER, la tâche
+    est exécutée directement après la validation de la transaction (pratique
+    en développement sans worker) ; les autres tâches en attente restent au worker.
+    """
+    if name not in _registry:
+        raise ValueError(f"Tâche inconnue : {name}")
+    queued = Task.objects.create(name=name, payload=payload, max_attempts=max_attempts)
+    if getattr(settings, 'SCHOOL_TASKS_EAGER', False):
+        transaction.on_commit(lambda: run_pending(ids=[queued.id]))
+    return queued
+
+
+def _claim_next(ids=None):
+    """Réserve la prochaine tâche due (UPDATE conditionnel, sûr entre plusieurs workers)"""
+    now = timezone.now()
+    due = Task.objects.filter(status='pending', run_after__lte=now)
+    if ids is not None:
+        due = due.filter(id__in=ids)
+    while True:
+        candidate = due.order_by('run_after', 'id').values_list('id', flat=True).first()
+        if candidate is None:
+            return None
+        claimed = Task.objects.filter(id=candidate, status='pending').update(
+            status='running', attempts=F('attempts') + 1, updated_at=now
+        )
+        if claimed:
+            return Task.objects.get(id=candidate)
+
+
+def _run(queued):
+    func, on_failure = _registry.get(queued.name, (None, None))
+    try:
+        if func is None:
+            raise LookupError(f"Tâche inconnue : {queued.name}")
+        func(**queued.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Échec de la tâche %s (tentative %s)", queued, queued.attempts, exc_info=True)
+        if queued.attempts >= queued.max_attempts:
+            Task.objects.filter(id=queued.id).update(status='failed', last_error=error, updated_at=timezone.now())
+            if on_failure is not None:
+                on_failure(**queued.payload)
+        else:
+            delay = min(RETRY_BASE_DELAY * 2 ** (queued.attempts - 1), RETRY_MAX_DELAY)
+            Task.objects.filter(id=queued.id).update(
+                status='pending', last_error=error, run_after=timezone.now() + delay, updated_at=timezone.now()
+            )
+        return False
+    Task.objects.filter(id=queued.id).update(status='done', last_error='', updated_at=timezone.now())
+    return True
+
+
+def run_pending(limit=None, ids=None):
+    """
+    Exécute les tâches dues, jusqu'à `limit`, seulement celles de `ids` si
+    donné. Retourne le nombre de tâches traitées.
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        queued = _claim_next(ids)
+        if queued is None:
+            break
+        _run(queued)
+        processed += 1
+    return processed
+
+
+def requeue_stale_tasks(timeout=STALE_TASK_TIMEOUT):
+    """Remet en file les tâches restées "en cours" (worker arrêté brutalement)"""
+    return Task.objects.filter(
+        status='running', updated_at__lt=timezone.now() - timeout
+    ).update(status='pending', updated_at=timezone.now())
+
+
+# --- Tâches -----------------------------------------------------------------
+
+def _mark_post_failed(post_id):
+    Post.objects.filter(id=post_id).update(status='failed')
+    touch_conversations(Post.objects.filter(id=post_id).values_list('conversation_id', flat=True))
+
+
+@task('process_post_image', on_failure=_mark_post_failed)
+def process_post_image(post_id):
+    """Décline la photo d'une publication puis la rend visible comme "prête" """
+    post = Post.objects.filter(id=post_id).first()
+    if post is None:
+        return
+    refresh_variants(post, 'image')
+    post.status = 'ready' if not post.image or has_variants(post.image) else 'failed'
+    Post.objects.filter(id=post_id).update(status=post.status)
+    if post.conversation_id:
+        touch_conversations([post.conversation_id])
+        publish_post(post, event='post.updated')
+
+
+@task('process_student_photo')
+def process_student_photo(student_id):
+    student = Student.objects.filter(id=student_id).first()
+    if student is not None:
+        refresh_variants(student, 'photo')
@@ -0,0 +1,12 @@
+# school_core/templatetags/school_images.py
+from django import template
+
+from school_core.images import variant_url
+
+register = template.Library()
+
+
+@register.filter
+def variant(field_file, name):
+    """URL d'une déclinaison d'image : {{ post.image|variant:"thumb" }} (thumb, feed, full)"""
+    return variant_url(field_file, name)
@@ -0,0 +1,43 @@
+# school_core/visibility.py
+# Conversations visibles par un utilisateur dans un niveau, commun aux trois interfaces
+
+from django.db.models import Q
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+from .models import Conversation
+
+
+def visible_conversations(user, level):
+    """
+    Conversations d'un niveau visibles par l'utilisateur.
+
+    - directeurs : toutes les conversations du niveau
+    - autres : celles dont ils sont participants ou créateurs
+
+    Le niveau d'une conversation est précalculé dans `Conversation.levels`
+    (voir school_core/summaries.py) : la requête n'utilise que des recherches
+    indexées sur les tables de liaison, sans jointure vers les enfants des
+    participants ni DISTINCT.
+    """
+    level_links = Conversation.levels.through.objects.filter(schoollevel_id=level.id)
+    conversations = Conversation.objects.filter(id__in=level_links.values('conversation_id'))
+    if user.is_director:
+        return conversations
+
+    memberships = Conversation.participants.through.objects.filter(customuser_id=user.id)
+    return conversations.filter(
+        Q(id__in=memberships.values('conversation_id')) | Q(created_by_id=user.id)
+    )
+
+
+def visible_conversation_ids(user, level):
+    """Identifiants des conversations visibles (voir visible_conversations)"""
+    return set(visible_conversations(user, level).values_list('id', flat=True))
+
+
+def get_visible_conversation_or_404(access, conversation_id):
+    """Conversation demandée, si elle est dans le périmètre (school_core/access.py), sinon 404"""
+    if not access.can_view_conversation(conversation_id):
+        raise Http404('Conversation introuvable')
+    return get_object_or_404(Conversation, id=conversation_id)